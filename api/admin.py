@@ -1,22 +1,64 @@
 from django.contrib import admin
-from .models import Wallet, Transaction
-import pandas as pd
-from django.shortcuts import render, redirect
+from django.contrib.admin.utils import quote
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.utils.html import format_html
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .models import Wallet, Transaction, Job
+from .jobs import enqueue_job, cancel_job, retry_job
+from .search import filter_descriptions
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.timezone import now
 from django.urls import path
 from django import forms
 from django.http import HttpResponseRedirect
-from datetime import datetime
 from django.urls import reverse
 
+MAX_REPORTED_ERRORS = 20
+# Transactions shown inline on a wallet's change page; the rest are in the linked changelist
+RECENT_TRANSACTIONS = 20
+# Below this many rows the exact COUNT(*) is cheap enough
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    # COUNT(*) over millions of rows dominates the unfiltered changelist; use the planner's row estimate there
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Summed over the partitions when the table is partitioned (see api/partitioning.py)
+                cursor.execute(
+                    "SELECT COALESCE(SUM(GREATEST(reltuples, 0)), 0)::bigint FROM pg_class "
+                    "WHERE oid = %s::regclass OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)",
+                    [queryset.model._meta.db_table] * 2,
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
 # CSV Upload Form
 class CSVUploadForm(forms.Form):
     csv_file = forms.FileField()
 
+class RecentTransactionFormSet(BaseInlineFormSet):
+    # Only the newest transactions get a form, so the page costs the same for any history size
+    def get_queryset(self):
+        if not hasattr(self, '_recent_queryset'):
+            self._recent_queryset = super().get_queryset().order_by('-date', '-id')[:RECENT_TRANSACTIONS]
+        return self._recent_queryset
+
 # Inline Transaction Management inside WalletAdmin
 class TransactionInline(admin.TabularInline):  # Tabular format for transactions
     model = Transaction
+    formset = RecentTransactionFormSet
+    verbose_name_plural = f"Recent transactions (latest {RECENT_TRANSACTIONS})"
     extra = 1  # Allows adding new transactions inline
     readonly_fields = ('formatted_date',)  # Readable date format
     fields = ('formatted_date', 'description', 'amount', 'transaction_type')
@@ -28,8 +70,10 @@ class TransactionInline(admin.TabularInline):  # Tabular format for transactions
 # Wallet Admin: Displays transactions inline + CSV Upload
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
-    list_display = ('user', 'balance')  # Show the balance
-    readonly_fields = ("balance",)  # Make balance read-only
+    list_display = ('user', 'balance')  # Stored on the wallet, so no per-row aggregate
+    list_select_related = ('user',)
+    # Maintained from transactions; version/updated_at also key the statement and insights caches
+    readonly_fields = ("balance", "total_credits", "total_debits", "version", "updated_at", "transaction_history")
     search_fields = ('user__username', 'balance')
     inlines = [TransactionInline]  # Show transactions inside Wallet
     actions = ['upload_csv_action']  # CSV Upload action
@@ -45,6 +89,15 @@ class WalletAdmin(admin.ModelAdmin):
     
     upload_csv_action.short_description = "Upload CSV Transactions"
 
+    def transaction_history(self, obj):
+        # Full history lives in the Transaction changelist, paginated and filterable by date
+        if obj.pk is None:
+            return "-"
+        url = reverse('admin:api_transaction_changelist')
+        return format_html('<a href="{}?wallet__id__exact={}">Browse all transactions</a>', url, quote(obj.pk))
+
+    transaction_history.short_description = "Transaction history"
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -53,7 +106,7 @@ class WalletAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
     def upload_csv_view(self, request, wallet_id):
-        wallet = Wallet.objects.get(id=wallet_id)
+        wallet = get_object_or_404(Wallet.objects.select_related('user'), id=wallet_id)
 
         if 'csv_file' in request.FILES:
             csv_file = request.FILES['csv_file']
@@ -62,42 +115,23 @@ class WalletAdmin(admin.ModelAdmin):
                 messages.error(request, 'Invalid file format. Please upload a CSV file.')
                 return redirect("..")
 
-            try:
-                df = pd.read_csv(csv_file)
-            except Exception as e:
-                messages.error(request, f"Error reading CSV: {e}")
+            # The import runs in the `run_jobs` worker so large files don't tie up a web worker
+            job = enqueue_job('csv_import', request.user, wallet=wallet, input_file=csv_file)
+            if not job.is_finished:
+                messages.success(request, f"CSV import for {wallet.user.username} queued as job #{job.pk}")
+                return redirect(f"/admin/api/wallet/{wallet.id}/change/")
+            if job.status != Job.SUCCEEDED:
+                messages.error(request, job.error or f"CSV import {job.status}")
                 return redirect("..")
+            result = job.result
 
-            required_columns = {"description", "amount", "transaction_type", "date"}
-            if not required_columns.issubset(df.columns):
-                messages.error(request, "CSV file must include: description, amount, transaction_type, date")
-                return redirect("..")
+            # Per-row report for skipped rows, capped so the message list stays readable
+            for error in result['errors'][:MAX_REPORTED_ERRORS]:
+                messages.warning(request, f"Skipped row {error['row']}: {error['error']}")
+            if result['skipped'] > MAX_REPORTED_ERRORS:
+                messages.warning(request, f"... and {result['skipped'] - MAX_REPORTED_ERRORS} more skipped rows")
 
-            # Create transactions linked to the selected wallet
-            for _, row in df.iterrows():
-                try:
-                    # Normalize and convert the date format to YYYY-MM-DD
-                    date_str = str(row["date"]).strip()
-                    date_str = date_str.replace("/", "-")  # Replace / with - if needed
-
-                    try:
-                        date_obj = datetime.strptime(date_str, "%d-%m-%Y").date()
-                    except ValueError:
-                        date_obj = datetime.strptime(date_str, "%d/%m/%Y").date()
-
-                    # Create the transaction linked to the selected wallet (no need for `user` here)
-                    Transaction.objects.create(
-                        wallet=wallet,
-                        description=row["description"],
-                        amount=row["amount"],
-                        transaction_type=row["transaction_type"],
-                        date=date_obj  # Save in the correct format
-                    )
-
-                except Exception as e:
-                    messages.warning(request, f"Skipping row due to error: {e}")
-
-            messages.success(request, f"Transactions imported successfully for {wallet.user.username}")
+            messages.success(request, f"Imported {result['created']} transactions for {wallet.user.username}")
             return redirect(f"/admin/api/wallet/{wallet.id}/change/")  # Redirect back to wallet page
 
         else:
@@ -110,9 +144,45 @@ class WalletAdmin(admin.ModelAdmin):
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('wallet', 'formatted_date', 'description', 'amount', 'transaction_type')
     list_filter = ('transaction_type', 'date')
+    # No date_hierarchy: across all wallets its MIN/MAX and year/month DISTINCT queries scan the whole
+    # table on every unfiltered load; the date filter's fixed ranges need no extra queries
     search_fields = ('wallet__user__username', 'description')
+    list_select_related = ('wallet__user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # Skips a second COUNT(*) over the whole table when filtering
 
     def formatted_date(self, obj):
         return obj.date.strftime('%d-%m-%Y')
 
     formatted_date.short_description = 'Date'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Descriptions go through the search index (see api/search.py); search_fields only keeps the box shown
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = filter_descriptions(Transaction.objects.all(), term).values('pk')
+        owners = Wallet.objects.filter(user__username__icontains=term).values('pk')
+        return queryset.filter(Q(pk__in=matches) | Q(wallet_id__in=owners)), False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'user', 'wallet', 'status', 'progress_current', 'progress_total', 'attempts', 'created_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = [f.name for f in Job._meta.fields]
+    list_select_related = ('user', 'wallet__user')
+    actions = ['cancel_jobs', 'retry_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    def cancel_jobs(self, request, queryset):
+        cancelled = sum(cancel_job(job) for job in queryset)
+        self.message_user(request, f"Cancelled {cancelled} jobs.")
+    cancel_jobs.short_description = "Cancel selected jobs"
+
+    def retry_jobs(self, request, queryset):
+        retried = sum(retry_job(job) for job in queryset)
+        self.message_user(request, f"Requeued {retried} jobs.")
+    retry_jobs.short_description = "Retry selected jobs"
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.timezone import localdate
+from .models import BalanceSnapshot, Transaction
+
+# Spending analytics over a wallet's history, computed on columnar numpy arrays
+# rather than row by row. Amounts are signed like the balance: debits add to it,
+# credits subtract. Results are cached per wallet version, so they are recomputed
+# only after the wallet's transactions change.
+
+ROLLING_WINDOWS = (7, 30)
+ROLLING_OUTPUT_DAYS = 90
+FORECAST_LOOKBACK_DAYS = 90
+RECURRING_MIN_OCCURRENCES = 3
+# Largest relative spread of intervals/amounts for a series to count as recurring
+RECURRING_TOLERANCE = 0.25
+CADENCES = {'weekly': 7, 'fortnightly': 14, 'monthly': 30, 'quarterly': 91, 'yearly': 365}
+
+
+def load_history(wallet_id, start_date=None, end_date=None):
+    rows = (
+        Transaction.objects.filter(wallet_id=wallet_id)
+        .filtered(start_date=start_date, end_date=end_date)
+        .order_by('date', 'id')
+        .values_list('date', 'description', 'amount', 'transaction_type')
+    )
+    dates, descriptions, amounts, types = zip(*rows) if rows else ((), (), (), ())
+    is_credit = np.array(types, dtype=object) == 'credit'
+    amounts = np.array(amounts, dtype=float)
+    return {
+        'date': np.array(dates, dtype='datetime64[D]'),
+        'description': np.array(descriptions, dtype=object),
+        'amount': amounts,
+        'is_credit': is_credit,
+        'net': np.where(is_credit, -amounts, amounts),
+    }
+
+
+def wallet_insights(wallet, start_date=None, end_date=None, horizon=30, top=10):
+    end = end_date or localdate()
+    params = f"{start_date}|{end}|{horizon}|{top}"
+    key = f"wallet-insights:{wallet.pk}:{wallet.version}:{params}"
+    cache = caches[settings.WALLET_CACHE_ALIAS]
+    insights = cache.get(key)
+    if insights is None:
+        history = load_history(wallet.pk, start_date=start_date, end_date=end_date)
+        # A past period is projected from its own closing balance, not today's
+        balance = wallet.balance if end_date is None else BalanceSnapshot.objects.balance_on(wallet.pk, end_date)
+        insights = compute_insights(history, float(balance), end, horizon=horizon, top=top)
+        cache.set(key, insights, settings.ANALYTICS_CACHE_TIMEOUT)
+    return insights
+
+
+def compute_insights(history, balance, end, horizon=30, top=10):
+    dates = history['date']
+    if not len(dates):
+        return {
+            'summary': {'transactions': 0, 'debits': 0.0, 'credits': 0.0, 'net': 0.0},
+            'rolling': [], 'descriptions': [], 'largest': [], 'recurring': [],
+            'forecast': _forecast(np.zeros(0), balance, np.datetime64(end, 'D'), horizon),
+        }
+
+    # Dense calendar of daily totals from the first transaction to `end`
+    first = dates.min()
+    last = max(dates.max(), np.datetime64(end, 'D'))
+    offsets = (dates - first).astype(np.int64)
+    span = int((last - first).astype(np.int64)) + 1
+    daily_net = np.bincount(offsets, weights=history['net'], minlength=span)
+
+    debits = np.where(history['is_credit'], 0.0, history['amount'])
+    credits = np.where(history['is_credit'], history['amount'], 0.0)
+    return {
+        'summary': {
+            'transactions': int(len(dates)),
+            'debits': _money(debits.sum()),
+            'credits': _money(credits.sum()),
+            'net': _money(history['net'].sum()),
+            'first_date': str(first),
+            'last_date': str(dates.max()),
+        },
+        'rolling': _rolling(daily_net, first),
+        'descriptions': _description_frequency(history, debits, credits, top),
+        'largest': _largest(history, top),
+        'recurring': _recurring(history),
+        'forecast': _forecast(daily_net, balance, last, horizon),
+    }
+
+
+def _rolling(daily_net, first):
+    series = pd.Series(daily_net)
+    averages = {window: series.rolling(window, min_periods=1).mean().to_numpy() for window in ROLLING_WINDOWS}
+    start = max(len(daily_net) - ROLLING_OUTPUT_DAYS, 0)
+    days = first + np.arange(start, len(daily_net))
+    return [
+        {
+            'date': str(day),
+            'net': _money(daily_net[i]),
+            **{f"avg_{window}d": _money(averages[window][i]) for window in ROLLING_WINDOWS},
+        }
+        for i, day in zip(range(start, len(daily_net)), days)
+    ]
+
+
+def _description_frequency(history, debits, credits, top):
+    labels, inverse, counts = np.unique(history['description'], return_inverse=True, return_counts=True)
+    debit_totals = np.bincount(inverse, weights=debits, minlength=len(labels))
+    credit_totals = np.bincount(inverse, weights=credits, minlength=len(labels))
+    order = np.argsort(-counts, kind='stable')[:top]
+    return [
+        {
+            'description': labels[i],
+            'count': int(counts[i]),
+            'share': round(float(counts[i] / counts.sum()), 4),
+            'debits': _money(debit_totals[i]),
+            'credits': _money(credit_totals[i]),
+        }
+        for i in order
+    ]
+
+
+def _largest(history, top):
+    amounts = history['amount']
+    top = min(top, len(amounts))
+    candidates = np.argpartition(-amounts, top - 1)[:top]
+    order = candidates[np.argsort(-amounts[candidates], kind='stable')]
+    return [
+        {
+            'date': str(history['date'][i]),
+            'description': history['description'][i],
+            'amount': _money(amounts[i]),
+            'transaction_type': 'credit' if history['is_credit'][i] else 'debit',
+        }
+        for i in order
+    ]
+
+
+def _recurring(history):
+    # Same description and type, at regular intervals, for a steady amount
+    frame = pd.DataFrame({
+        'description': history['description'],
+        'transaction_type': np.where(history['is_credit'], 'credit', 'debit'),
+        'date': history['date'],
+        'amount': history['amount'],
+    })
+    keys = ['description', 'transaction_type']
+    frame = frame.sort_values([*keys, 'date'], kind='stable')
+    frame['interval'] = frame.groupby(keys)['date'].diff().dt.days
+    groups = frame.groupby(keys).agg(
+        occurrences=('date', 'size'),
+        last_date=('date', 'max'),
+        interval=('interval', 'median'),
+        interval_std=('interval', 'std'),
+        amount=('amount', 'mean'),
+        amount_std=('amount', 'std'),
+    )
+    groups = groups[
+        (groups['occurrences'] >= RECURRING_MIN_OCCURRENCES)
+        & (groups['interval'] > 0)
+        & (groups['interval_std'].fillna(0) <= RECURRING_TOLERANCE * groups['interval'])
+        & (groups['amount_std'].fillna(0) <= RECURRING_TOLERANCE * groups['amount'])
+    ]
+    next_dates = groups['last_date'] + pd.to_timedelta(groups['interval'].round(), unit='D')
+    return [
+        {
+            'description': description,
+            'transaction_type': transaction_type,
+            'cadence': _cadence(row.interval),
+            'interval_days': float(row.interval),
+            'amount': _money(row.amount),
+            'occurrences': int(row.occurrences),
+            'last_date': row.last_date.date().isoformat(),
+            'next_date': next_date.date().isoformat(),
+        }
+        for ((description, transaction_type), row), next_date in zip(groups.iterrows(), next_dates)
+    ]
+
+
+def _cadence(interval):
+    name, days = min(CADENCES.items(), key=lambda item: abs(item[1] - interval))
+    return name if abs(days - interval) <= RECURRING_TOLERANCE * days else f"every {interval:g} days"
+
+
+def _forecast(daily_net, balance, last, horizon):
+    # Projects the recent mean daily net flow forward, with a ~95% band that widens with sqrt(days)
+    lookback = daily_net[-FORECAST_LOOKBACK_DAYS:]
+    mean = float(lookback.mean()) if len(lookback) else 0.0
+    std = float(lookback.std(ddof=1)) if len(lookback) > 1 else 0.0
+    steps = np.arange(1, horizon + 1)
+    expected = balance + mean * steps
+    spread = 1.96 * std * np.sqrt(steps)
+    days = last + steps
+    return {
+        'lookback_days': int(len(lookback)),
+        'mean_daily_net': _money(mean),
+        'starting_balance': _money(balance),
+        'projected_balance': _money(expected[-1]),
+        'points': [
+            {'date': str(day), 'balance': _money(value), 'low': _money(value - band), 'high': _money(value + band)}
+            for day, value, band in zip(days, expected, spread)
+        ],
+    }
+
+
+def _money(value):
+    return round(float(value), 2)
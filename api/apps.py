@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import metrics  # noqa: F401
+        from . import checks  # noqa: F401
+        from django.db.models.signals import pre_migrate
+        from .partitioning import check_transaction_migrations
+
+        pre_migrate.connect(check_transaction_migrations, sender=self)
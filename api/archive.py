@@ -0,0 +1,142 @@
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils.timezone import now
+from .models import ArchivedIdempotencyKey, Wallet, Transaction, TransactionArchive, WalletCarryForward
+from .signals import invalidate_wallet_caches
+
+# Cold storage for old transactions. archive_wallet() moves a wallet's
+# transactions dated before a cut-off out of api_transaction into one compressed
+# TransactionArchive row per month and adds their totals to the wallet's
+# WalletCarryForward row. The wallet totals, daily summaries and balance
+# snapshots are left as they are, so balances stay correct while history,
+# search, export and analytics queries only read the recent rows. Idempotency
+# keys of archived rows move to ArchivedIdempotencyKey, so retries stay deduplicated.
+
+COLUMNS = ('id', 'date', 'description', 'amount', 'transaction_type', 'idempotency_key')
+COMPRESSION_LEVEL = 9
+
+
+@dataclass
+class ArchiveResult:
+    transactions: int = 0
+    archives: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+
+
+def archive_wallet(wallet_id, before, chunk_size=5000):
+    """
+    Archive the wallet's transactions dated before `before`, one month at a time.
+
+    Runs in one transaction with the wallet row locked, so concurrent writes to
+    the wallet wait rather than interleave with the move.
+    """
+    result = ArchiveResult()
+    with db_transaction.atomic():
+        _lock_wallet(wallet_id)
+        old = Transaction.objects.filter(wallet_id=wallet_id, date__lt=before)
+        rows = old.order_by('date', 'id').values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+
+        # Rows come in date order, so each month is written out as soon as the next one starts
+        totals = {'credit': [Decimal('0'), 0], 'debit': [Decimal('0'), 0]}
+        month, month_rows = None, []
+        for row in rows:
+            if row[1].replace(day=1) != month:
+                _write_month(wallet_id, month, month_rows, result)
+                month, month_rows = row[1].replace(day=1), []
+            month_rows.append(row)
+            if row[4] in totals:
+                totals[row[4]][0] += row[3]
+                totals[row[4]][1] += 1
+        _write_month(wallet_id, month, month_rows, result)
+        if not result.transactions:
+            return result
+
+        archived_through = before - timedelta(days=1)
+        carry_forward, _ = WalletCarryForward.objects.get_or_create(
+            wallet_id=wallet_id, defaults={'archived_through': archived_through},
+        )
+        carry_forward.archived_through = max(carry_forward.archived_through, archived_through)
+        carry_forward.credits += totals['credit'][0]
+        carry_forward.debits += totals['debit'][0]
+        carry_forward.credit_count += totals['credit'][1]
+        carry_forward.debit_count += totals['debit'][1]
+        carry_forward.updated_at = now()
+        carry_forward.save()
+
+        # A raw DELETE skips the post_delete signals: the totals still count these rows
+        old._raw_delete(old.db)
+        _changed(wallet_id)
+    return result
+
+
+def restore_wallet(wallet_id, chunk_size=5000):
+    # Moves every archived transaction of the wallet back into api_transaction, with its original id
+    restored = 0
+    with db_transaction.atomic():
+        _lock_wallet(wallet_id)
+        archives = TransactionArchive.objects.filter(wallet_id=wallet_id)
+        # The restored rows hold their keys again
+        ArchivedIdempotencyKey.objects.filter(wallet_id=wallet_id).delete()
+        for archive in archives.order_by('month', 'id').iterator(chunk_size=1):
+            transactions = [Transaction(wallet_id=wallet_id, **row) for row in archived_rows(archive)]
+            # bulk_create sends no post_save, so the totals are not counted twice
+            Transaction.objects.bulk_create(transactions, batch_size=chunk_size)
+            restored += len(transactions)
+        archives.delete()
+        WalletCarryForward.objects.filter(wallet_id=wallet_id).delete()
+        if restored:
+            _changed(wallet_id)
+    return restored
+
+
+def archived_rows(archive):
+    for values in json.loads(zlib.decompress(bytes(archive.data))):
+        row = dict(zip(COLUMNS, values))
+        row['date'] = date.fromisoformat(row['date'])
+        row['amount'] = Decimal(row['amount'])
+        yield row
+
+
+def _write_month(wallet_id, month, rows, result):
+    if not rows:
+        return
+    raw = json.dumps(
+        [[pk, day.isoformat(), description, str(amount), transaction_type, key]
+         for pk, day, description, amount, transaction_type, key in rows],
+        separators=(',', ':'),
+    ).encode()
+    data = zlib.compress(raw, COMPRESSION_LEVEL)
+    ArchivedIdempotencyKey.objects.bulk_create(
+        ArchivedIdempotencyKey(wallet_id=wallet_id, idempotency_key=row[5]) for row in rows if row[5]
+    )
+    TransactionArchive.objects.create(
+        wallet_id=wallet_id,
+        month=month,
+        first_date=rows[0][1],
+        last_date=rows[-1][1],
+        transaction_count=len(rows),
+        credits=sum((row[3] for row in rows if row[4] == 'credit'), Decimal('0')),
+        debits=sum((row[3] for row in rows if row[4] == 'debit'), Decimal('0')),
+        data=data,
+    )
+    result.transactions += len(rows)
+    result.archives += 1
+    result.raw_bytes += len(raw)
+    result.stored_bytes += len(data)
+
+
+def _lock_wallet(wallet_id):
+    # The same row lock Wallet.adjust_totals takes, so writes to the wallet wait for the move
+    list(Wallet.objects.select_for_update().filter(pk=wallet_id).values_list('pk', flat=True))
+
+
+def _changed(wallet_id):
+    # Cached statements and exports listed the moved rows; give the wallet a new version
+    Wallet.objects.filter(pk=wallet_id).update(version=F('version') + 1, updated_at=now())
+    db_transaction.on_commit(lambda: invalidate_wallet_caches(wallet_id))
@@ -0,0 +1,180 @@
+import os
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.db import connections, router
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from .authentication import WalletJWTAuthentication
+from .exports import (
+    CONTENT_TYPES, ExportUnavailable, astream_csv, astream_ndjson, export_columns, export_rows, write_parquet,
+)
+from .models import Wallet, Transaction
+from .pagination import TransactionCursorPagination
+from .serializers import WalletSerializer, TransactionSerializer, TransactionFilterSerializer, DateRangeSerializer
+from .statement_cache import open_cached_statement, statement_digest
+from .wallet_cache import aget_wallet_summary
+
+# Native async variants of the read-only wallet, history, PDF and export
+# endpoints. Served by an ASGI server (see the web-asgi process in the Procfile),
+# a slow client or database round trip only suspends a coroutine instead of
+# pinning a whole worker. DRF has no async views, so these are plain Django views
+# that authenticate and render through DRF's classes.
+#
+# Under ASGI, Django reads a sync streaming body (the sync PDF and export views)
+# into memory before sending it, so ASGI clients should download through these;
+# the sync views only stream when served by the WSGI web process.
+
+
+def async_api_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Token authentication is stateless, so it never touches the database here
+        authenticator = WalletJWTAuthentication()
+        request = Request(request, authenticators=[authenticator])
+        try:
+            if request.method not in ('GET', 'HEAD'):
+                raise MethodNotAllowed(request.method)
+            if not request.user.is_authenticated:
+                raise NotAuthenticated()
+            return await view(request, *args, **kwargs)
+        except APIException as e:
+            detail = e.detail if isinstance(e.detail, (dict, list)) else {'detail': e.detail}
+            response = _json(detail, status=e.status_code)
+            if e.status_code == 401:
+                response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+    return wrapper
+
+
+def _json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def _wallet(request, queryset=None):
+    if queryset is None:
+        queryset = Wallet.objects.all()
+    wallet_id = getattr(request.user, 'wallet_id', None)
+    if wallet_id is None:
+        return (await queryset.aget_or_create(user_id=request.user.pk))[0]
+    try:
+        return await queryset.aget(pk=wallet_id)
+    except Wallet.DoesNotExist:
+        raise NotFound()
+
+
+@async_api_view
+async def get_wallet(request):
+    async def build():
+        return dict(WalletSerializer(await _wallet(request)).data)
+
+    return _json(await aget_wallet_summary(request.user.pk, build))
+
+
+@async_api_view
+async def transaction_history(request):
+    params = TransactionFilterSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    filters = params.validated_data
+    fields = filters.pop('fields', None) or TransactionSerializer.Meta.fields
+
+    wallet_id = getattr(request.user, 'wallet_id', None) or (await _wallet(request)).pk
+    transactions = Transaction.objects.filter(wallet_id=wallet_id).filtered(**filters)
+    columns = dict.fromkeys(['id', 'date', *fields])
+    paginator = TransactionCursorPagination()
+    page = await paginator.apaginate_queryset(transactions.values(*columns), request)
+    serializer = TransactionSerializer(page, many=True, fields=fields)
+    return _json(paginator.get_paginated_response(serializer.data).data)
+
+
+@async_api_view
+async def transaction_history_pdf(request):
+    period = DateRangeSerializer(data=request.query_params)
+    period.is_valid(raise_exception=True)
+    wallet = await _wallet(request, Wallet.objects.select_related('user'))
+
+    etag = quote_etag(statement_digest(wallet, 'pdf', period.validated_data))
+    last_modified = int(wallet.updated_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    # reportlab is synchronous: render on a pool thread so the event loop keeps serving other requests
+    output = await _in_pool_thread(_render_statement, wallet, period.validated_data)
+    response = _file_response(output, 'transaction_history.pdf', 'application/pdf')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@async_api_view
+async def transaction_export(request, export_format):
+    if export_format not in CONTENT_TYPES:
+        return _json({"error": f"Unsupported export format, use one of: {', '.join(CONTENT_TYPES)}"}, status=404)
+    params = TransactionFilterSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    filters = params.validated_data
+    columns = export_columns(filters.pop('fields', None))
+    filename = f"transactions.{export_format}"
+
+    streams = {'csv': astream_csv, 'ndjson': astream_ndjson}
+    if export_format in streams:
+        wallet_id = getattr(request.user, 'wallet_id', None) or (await _wallet(request)).pk
+        # The body streams after the request's database routing has ended, so pick the database now
+        rows = export_rows(wallet_id, columns, using=router.db_for_read(Transaction), **filters)
+        response = StreamingHttpResponse(streams[export_format](rows, columns), content_type=CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    wallet = await _wallet(request)
+    try:
+        output = await _in_pool_thread(_render_parquet, wallet, columns, filters)
+    except ExportUnavailable as e:
+        return _json({"error": str(e)}, status=501)
+    return _file_response(output, filename, CONTENT_TYPES[export_format])
+
+
+def _file_response(file, filename, content_type):
+    # FileResponse hands ASGI a sync iterator, which Django reads into memory in
+    # one go before sending; an async iterator is sent block by block instead
+    response = StreamingHttpResponse(_file_blocks(file), content_type=content_type)
+    response['Content-Length'] = os.fstat(file.fileno()).st_size
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+async def _file_blocks(file):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while block := await read(FileResponse.block_size):
+            yield block
+    finally:
+        file.close()
+
+
+async def _in_pool_thread(func, *args):
+    def run():
+        try:
+            return func(*args)
+        finally:
+            # Pool threads are not request threads, so nothing else closes the connection they opened
+            connections.close_all()
+
+    return await sync_to_async(run, thread_sensitive=False)()
+
+
+def _render_statement(wallet, period):
+    from .statements import write_transaction_pdf
+
+    return open_cached_statement(wallet, 'pdf', period, lambda file: write_transaction_pdf(wallet, file, **period))
+
+
+def _render_parquet(wallet, columns, filters):
+    return open_cached_statement(
+        wallet, 'parquet', {**filters, 'fields': ','.join(columns)},
+        lambda file: write_parquet(export_rows(wallet.pk, columns, **filters), columns, file),
+    )
@@ -0,0 +1,49 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+WALLET_ID_CLAIM = 'wallet_id'
+
+
+class WalletTokenUser(TokenUser):
+    # Stand-in for request.user built from the token claims, without touching the database
+
+    @cached_property
+    def wallet_id(self):
+        return self.token.get(WALLET_ID_CLAIM)
+
+
+class WalletJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts the signed claims instead of loading the User row.
+
+    request.user is a WalletTokenUser carrying the user id, username, staff flags
+    and wallet id issued at login, so the common read paths need no user or
+    wallet lookup. Deactivating a user only takes effect once their access token
+    expires.
+    """
+
+    def get_user(self, validated_token):
+        super().get_user(validated_token)  # Validates the user id claim
+        return WalletTokenUser(validated_token)
+
+
+def tokens_for_user(user, wallet_id):
+    refresh = RefreshToken.for_user(user)
+    # Claims are copied into the access token derived from this refresh token
+    refresh['username'] = user.username
+    refresh['is_staff'] = user.is_staff
+    refresh['is_superuser'] = user.is_superuser
+    refresh[WALLET_ID_CLAIM] = wallet_id
+    return refresh
+
+
+class WalletTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # api/token/ issues the same claims as the login view
+    @classmethod
+    def get_token(cls, user):
+        from .models import Wallet
+
+        return tokens_for_user(user, Wallet.objects.get_or_create(user=user)[0].pk)
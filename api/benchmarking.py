@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from .models import Wallet, Transaction
+
+
+DATE_DISTRIBUTIONS = {
+    # Day offset within the seeded period
+    'uniform': lambda rng, days: rng.randrange(days),
+    # Denser towards the end of the period, like an active account
+    'recent': lambda rng, days: min(int(rng.triangular(0, days, days)), days - 1),
+}
+
+
+def seed_wallets(users, transactions_per_user, start=None, days=730, credit_ratio=0.3,
+                 batch_size=10000, prefix='bench', seed=0, date_distribution='uniform'):
+    # Seeds synthetic users/wallets/transactions with bulk inserts. bulk_create skips
+    # the post_save signals, so the wallet totals are rebuilt at the end.
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=days)
+    day_offset = DATE_DISTRIBUTIONS[date_distribution]
+
+    User.objects.bulk_create(
+        [User(username=f"{prefix}-{i}", password='!') for i in range(users)],
+        batch_size=batch_size,
+    )
+    user_ids = User.objects.filter(username__startswith=f"{prefix}-").values_list('pk', flat=True)
+    Wallet.objects.bulk_create([Wallet(user_id=pk) for pk in user_ids], batch_size=batch_size)
+    wallet_ids = list(Wallet.objects.filter(user_id__in=user_ids).values_list('pk', flat=True))
+
+    batch = []
+    for wallet_id in wallet_ids:
+        for _ in range(transactions_per_user):
+            batch.append(Transaction(
+                wallet_id=wallet_id,
+                date=start + timedelta(days=day_offset(rng, days)),
+                description=rng.choice(SAMPLE_DESCRIPTIONS),
+                amount=Decimal(rng.randrange(100, 50000)) / 100,
+                transaction_type='credit' if rng.random() < credit_ratio else 'debit',
+            ))
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+    if batch:
+        Transaction.objects.bulk_create(batch)
+
+    for wallet in Wallet.objects.filter(pk__in=wallet_ids):
+        wallet.rebuild_totals()
+    return wallet_ids
+
+
+def time_call(func, repeat=20):
+    # Returns per-call latencies in milliseconds
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.fmean(ordered),
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+    }
+
+
+SAMPLE_DESCRIPTIONS = [
+    'Salary', 'Rent', 'Groceries', 'Coffee', 'Electricity bill', 'Mobile phone',
+    'Transfer', 'Restaurant', 'Fuel', 'Gym membership', 'Streaming subscription', 'Refund',
+]
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# The replica pin that keeps a user on the primary after a write (api/db_routers.py)
+# lives in the default cache, so it only holds if every web process sees that cache.
+
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+HOST_LOCAL_CACHES = {
+    'django.core.cache.backends.filebased.FileBasedCache',
+}
+
+
+@register(Tags.caches)
+def check_replica_pin_cache(app_configs, **kwargs):
+    if not settings.DATABASE_REPLICAS:
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"DATABASE_REPLICAS is set but the default cache ({backend}) is not shared between processes.",
+            hint=(
+                "A user's write would only pin them to the primary in the process that served it, so their "
+                "next read can hit a lagging replica. Use CACHE_BACKEND=file when all web processes run on "
+                "one host, or a shared cache server such as Redis or Memcached."
+            ),
+            id='api.E001',
+        )]
+    if backend in HOST_LOCAL_CACHES:
+        return [Warning(
+            f"DATABASE_REPLICAS is set and the default cache ({backend}) is only shared on one host.",
+            hint="Replica pins do not reach web processes on other hosts; use a shared cache server there.",
+            id='api.W001',
+        )]
+    return []
@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+import pandas as pd
+from django.db import transaction as db_transaction
+from .models import Transaction
+from .signals import transactions_bulk_created
+
+REQUIRED_COLUMNS = ["description", "amount", "transaction_type", "date"]
+DATE_FORMAT = "%d-%m-%Y"  # '/' separators are normalised to '-' before parsing
+MAX_AMOUNT = 10 ** 8  # Transaction.amount is DecimalField(max_digits=10, decimal_places=2)
+
+
+class CSVImportError(Exception):
+    pass
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)  # [(row number, message), ...], capped at max_errors
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'errors': [{'row': row, 'error': message} for row, message in self.errors],
+        }
+
+
+def import_transactions_csv(wallet, csv_file, chunk_size=5000, max_errors=1000, progress=None):
+    """
+    Stream a bank export into `wallet` in chunks of `chunk_size` rows.
+
+    Each chunk is parsed and validated column-wise, then written with one
+    bulk_create. The whole file is imported inside a single atomic block, so a
+    database error leaves nothing behind. Rows that fail validation are skipped
+    and reported by their row number: the n-th data row after the header, not
+    counting blank lines. Rows with quoted line breaks span several lines of
+    the file, so physical line numbers would drift.
+    """
+    try:
+        reader = pd.read_csv(csv_file, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    except Exception as e:
+        raise CSVImportError(f"Error reading CSV: {e}")
+
+    result = ImportResult()
+    with db_transaction.atomic():
+        try:
+            for chunk in reader:
+                missing = set(REQUIRED_COLUMNS) - set(chunk.columns)
+                if missing:
+                    raise CSVImportError("CSV file must include: " + ", ".join(REQUIRED_COLUMNS))
+                _import_chunk(wallet, chunk, result, max_errors)
+                if progress:
+                    progress(result)
+        except (pd.errors.ParserError, UnicodeDecodeError, ValueError) as e:
+            raise CSVImportError(f"Error reading CSV: {e}")
+    result.errors.sort()
+    return result
+
+
+def _import_chunk(wallet, chunk, result, max_errors):
+    description = chunk["description"].str.strip()
+    transaction_type = chunk["transaction_type"].str.strip().str.lower()
+    amount = pd.to_numeric(chunk["amount"].str.strip(), errors="coerce").round(2)
+    date = pd.to_datetime(
+        chunk["date"].str.strip().str.replace("/", "-", regex=False), format=DATE_FORMAT, errors="coerce"
+    )
+
+    # One vectorised pass per rule; the first failing rule is reported for each row
+    checks = [
+        (date.isna(), "invalid date, expected DD-MM-YYYY or DD/MM/YYYY"),
+        (amount.isna(), "invalid amount"),
+        (amount < 0, "amount must not be negative, use transaction_type for the direction"),
+        (amount >= MAX_AMOUNT, "amount out of range"),
+        (~transaction_type.isin(["credit", "debit"]), "transaction_type must be 'credit' or 'debit'"),
+        (description.eq(""), "missing description"),
+        (description.str.len() > Transaction._meta.get_field("description").max_length, "description too long"),
+    ]
+    invalid = pd.Series(False, index=chunk.index)
+    for failed, message in checks:
+        new_failures = failed & ~invalid
+        if new_failures.any():
+            for index in new_failures[new_failures].index:
+                if len(result.errors) < max_errors:
+                    # The index counts the parsed data rows from 0 across chunks
+                    result.errors.append((int(index) + 1, message))
+        invalid |= failed
+    result.skipped += int(invalid.sum())
+
+    valid = ~invalid
+    transactions = [
+        Transaction(wallet=wallet, description=d, amount=a, transaction_type=t, date=dt)
+        for d, a, t, dt in zip(
+            description[valid],
+            amount[valid].map(lambda value: Decimal(f"{value:.2f}")),
+            transaction_type[valid],
+            date[valid].dt.date,
+        )
+    ]
+    if transactions:
+        Transaction.objects.bulk_create(transactions)
+        transactions_bulk_created.send(sender=Transaction, wallet_id=wallet.pk, transactions=transactions)
+        result.created += len(transactions)
@@ -0,0 +1,64 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Read-replica routing. Reads made by the views in REPLICA_READ_VIEWS go to one of
+# DATABASE_REPLICAS (ReadReplicaMiddleware marks those requests); everything else
+# stays on the primary: writes, auth and session lookups, reads inside a
+# transaction, and all requests from a user who wrote within the last
+# REPLICA_STICKY_SECONDS, so users always read their own writes.
+
+PRIMARY_ONLY_APPS = {'admin', 'auth', 'contenttypes', 'sessions', 'token_blacklist'}
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+def _pin_key(user_id):
+    return f"replica-pin:user:{user_id}"
+
+
+def pin_to_primary(user_id):
+    # Stored in the default cache, which has to be shared by all processes for this to hold (see api/checks.py)
+    if settings.DATABASE_REPLICAS:
+        cache.set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+class RequestRouting:
+    def __init__(self, request):
+        self.request = request
+        self.use_replica = False
+        self._database = None
+
+    def database(self):
+        # Picked on the first routed read, after DRF has authenticated the user, and kept for the request
+        if self._database is None:
+            user = getattr(self.request, 'user', None)
+            pinned = user is not None and user.is_authenticated and is_pinned(user.pk)
+            self._database = DEFAULT_DB_ALIAS if pinned else random.choice(settings.DATABASE_REPLICAS)
+        return self._database
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if routing is None or not routing.use_replica:
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return routing.database()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+
+# Django's hashers with their cost parameters read from settings (see PASSWORD_* in
+# backend/settings.py). They keep the stock algorithm names, so existing hashes
+# still verify, and must_update() compares against the configured cost: a user
+# whose stored hash uses another algorithm or cost is rehashed on their next login.
+
+
+def _cost(name, default):
+    value = getattr(settings, name, None)
+    return default if value is None else value
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _cost('PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunableScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _cost('PASSWORD_SCRYPT_WORK_FACTOR', ScryptPasswordHasher.work_factor)
+
+    @property
+    def parallelism(self):
+        return _cost('PASSWORD_SCRYPT_PARALLELISM', ScryptPasswordHasher.parallelism)
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    # Needs the optional argon2-cffi package
+    @property
+    def time_cost(self):
+        return _cost('PASSWORD_ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _cost('PASSWORD_ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _cost('PASSWORD_ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from itertools import islice
+from django.db import IntegrityError, transaction as db_transaction
+from rest_framework.exceptions import ValidationError
+from .models import ArchivedIdempotencyKey, Transaction
+from .serializers import TransactionIngestSerializer
+from .signals import transactions_bulk_created
+
+MAX_REPORTED_ERRORS = 100
+
+
+class IngestConflict(Exception):
+    # A concurrent request inserted some of the same idempotency keys first
+    pass
+
+
+class IngestTooLarge(Exception):
+    pass
+
+
+@dataclass
+class IngestResult:
+    created: int = 0
+    duplicates: int = 0
+
+
+def ingest_transactions(wallet, items, idempotency_prefix=None, chunk_size=1000, max_items=10000):
+    """
+    Validate and insert a batch of transactions into `wallet` all-or-nothing.
+
+    Items are validated and written `chunk_size` at a time inside one atomic
+    block. Items whose idempotency key already exists for the wallet (or repeats
+    earlier in the batch) are skipped, so retrying a batch never double-posts.
+    Items without a key get "<idempotency_prefix>:<index>" when the request
+    carried an Idempotency-Key header.
+    """
+    result = IngestResult()
+    errors = {}
+    created = []
+    seen_keys = set()
+    items = iter(items)
+    offset = 0
+
+    try:
+        with db_transaction.atomic():
+            while True:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    break
+                if offset + len(chunk) > max_items:
+                    raise IngestTooLarge(f"A batch may contain at most {max_items} transactions")
+
+                serializer = TransactionIngestSerializer(data=chunk, many=True)
+                if not serializer.is_valid():
+                    for index, item_errors in enumerate(serializer.errors):
+                        if item_errors and len(errors) < MAX_REPORTED_ERRORS:
+                            errors[offset + index] = item_errors
+                if not errors:
+                    transactions = _new_transactions(
+                        wallet, serializer.validated_data, offset, idempotency_prefix, seen_keys, result,
+                    )
+                    Transaction.objects.bulk_create(transactions)
+                    created.extend(transactions)
+                offset += len(chunk)
+
+            if errors:
+                # Report every invalid item, then roll back the whole batch
+                raise ValidationError({'errors': errors})
+
+            # Wallet totals, rollups and snapshots are updated once for the whole batch
+            if created:
+                transactions_bulk_created.send(sender=Transaction, wallet_id=wallet.pk, transactions=created)
+    except IntegrityError:
+        raise IngestConflict("Another request is ingesting the same idempotency keys; retry the batch")
+
+    result.created = len(created)
+    return result
+
+
+def _new_transactions(wallet, validated_items, offset, idempotency_prefix, seen_keys, result):
+    for index, item in enumerate(validated_items):
+        if not item.get('idempotency_key') and idempotency_prefix:
+            item['idempotency_key'] = f"{idempotency_prefix}:{offset + index}"
+
+    # One query per chunk for keys that are already stored, including those of archived transactions
+    keys = [item['idempotency_key'] for item in validated_items if item.get('idempotency_key')]
+    if keys:
+        stored = Transaction.objects.filter(wallet=wallet, idempotency_key__in=keys).order_by().values_list('idempotency_key', flat=True)
+        archived = ArchivedIdempotencyKey.objects.filter(wallet=wallet, idempotency_key__in=keys).order_by().values_list('idempotency_key', flat=True)
+        seen_keys.update(stored.union(archived))
+
+    transactions = []
+    for item in validated_items:
+        key = item.get('idempotency_key')
+        if key:
+            if key in seen_keys:
+                result.duplicates += 1
+                continue
+            seen_keys.add(key)
+        transactions.append(Transaction(wallet=wallet, **item))
+    return transactions
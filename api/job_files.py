@@ -0,0 +1,62 @@
+import io
+from .models import JobFile
+
+# Job inputs and results as rows of JobFile chunks. Files are written a chunk at a
+# time from an upload or a file on local disk, and read back through a buffered
+# file object that fetches one chunk per query, so both pandas and FileResponse
+# can consume them without loading the whole file.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def write_job_file(job, role, file):
+    # Replaces any earlier file of the role; `file` is an UploadedFile or a binary file object
+    delete_job_files(job, role)
+    chunks = file.chunks(CHUNK_SIZE) if hasattr(file, 'chunks') else iter(lambda: file.read(CHUNK_SIZE), b'')
+    index = 0
+    for data in chunks:
+        if data:
+            JobFile.objects.create(job=job, role=role, index=index, data=data)
+            index += 1
+    return index
+
+
+def open_job_file(job, role):
+    return io.BufferedReader(_ChunkReader(job.pk, role), buffer_size=CHUNK_SIZE)
+
+
+def has_job_file(job, role):
+    return JobFile.objects.filter(job=job, role=role).exists()
+
+
+def delete_job_files(job, role=None):
+    files = JobFile.objects.filter(job=job)
+    if role is not None:
+        files = files.filter(role=role)
+    files.delete()
+
+
+class _ChunkReader(io.RawIOBase):
+    def __init__(self, job_id, role):
+        self.job_id = job_id
+        self.role = role
+        self.index = 0
+        self.chunk = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.chunk:
+            data = (
+                JobFile.objects.filter(job_id=self.job_id, role=self.role, index=self.index)
+                .values_list('data', flat=True).first()
+            )
+            if data is None:
+                return 0
+            self.chunk = memoryview(bytes(data))
+            self.index += 1
+        size = min(len(buffer), len(self.chunk))
+        buffer[:size] = self.chunk[:size]
+        self.chunk = self.chunk[size:]
+        return size
@@ -0,0 +1,172 @@
+import logging
+import tempfile
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils.timezone import now
+from .job_files import CHUNK_SIZE, delete_job_files, open_job_file, write_job_file
+from .models import Job, JobFile
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    # Raised by handlers for errors a retry cannot fix, e.g. a malformed CSV
+    pass
+
+
+def enqueue_job(kind, user, wallet=None, params=None, input_file=None):
+    # `input_file` (e.g. an upload) is copied chunk by chunk into the job's JobFile rows
+    with db_transaction.atomic():
+        job = Job.objects.create(kind=kind, user_id=user.pk, wallet=wallet, params=params or {})
+        if input_file is not None:
+            write_job_file(job, JobFile.INPUT, input_file)
+    if getattr(settings, 'JOBS_RUN_INLINE', False):
+        # Local development/tests without a `run_jobs` worker
+        _mark_running([job.pk], 'inline')
+        execute_job(job.pk)
+        job.refresh_from_db()
+    return job
+
+
+def claim_jobs(limit, worker):
+    # Hand out up to `limit` due jobs; SKIP LOCKED lets several workers poll the same table
+    if limit <= 0:
+        return []
+    with db_transaction.atomic():
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, run_after__lte=now())
+            .order_by('run_after', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        _mark_running(job_ids, worker)
+    return job_ids
+
+
+def requeue_stale_jobs(stale_after):
+    # Jobs whose worker died stop heartbeating; put them back in the queue unless they
+    # have used up their attempts, so a job that keeps killing its worker stops there
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now() - timedelta(seconds=stale_after))
+    exhausted = list(stale.filter(attempts__gte=F('max_attempts')).values_list('pk', flat=True))
+    Job.objects.filter(pk__in=exhausted, status=Job.RUNNING).update(
+        status=Job.FAILED, worker='', error="The worker stopped responding on the last attempt", finished_at=now(),
+    )
+    JobFile.objects.filter(job_id__in=exhausted, role=JobFile.INPUT).delete()
+    return stale.filter(attempts__lt=F('max_attempts')).update(status=Job.PENDING, worker='', run_after=now())
+
+
+def _mark_running(job_ids, worker):
+    timestamp = now()
+    Job.objects.filter(pk__in=job_ids).update(
+        status=Job.RUNNING, worker=worker, attempts=F('attempts') + 1,
+        started_at=timestamp, heartbeat_at=timestamp,
+    )
+
+
+def execute_job(job_id):
+    job = Job.objects.select_related('wallet__user').get(pk=job_id)
+    try:
+        if job.cancel_requested:
+            raise JobCancelled()
+        JOB_HANDLERS[job.kind](job)
+    except JobCancelled:
+        _finish(job, Job.CANCELLED)
+    except JobFailed as e:
+        _finish(job, Job.FAILED, error=str(e))
+    except Exception as e:
+        logger.exception("Job %s failed (attempt %s of %s)", job.pk, job.attempts, job.max_attempts)
+        if job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.PENDING, worker='', error=str(e), run_after=now() + retry_delay(job.attempts),
+            )
+        else:
+            _finish(job, Job.FAILED, error=str(e))
+    else:
+        _finish(job, Job.SUCCEEDED, fields=['result', 'result_filename', 'result_content_type', 'progress_current'])
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=30 * 2 ** max(attempts - 1, 0))
+
+
+def _finish(job, status, error='', fields=()):
+    job.status = status
+    job.error = error
+    job.finished_at = now()
+    job.save(update_fields=['status', 'error', 'finished_at', *fields])
+    # Finished jobs never read their upload again; retrying an import needs a new upload
+    delete_job_files(job, JobFile.INPUT)
+
+
+def cancel_job(job):
+    # Pending jobs are cancelled outright; running ones stop at their next progress report
+    if Job.objects.filter(pk=job.pk, status=Job.PENDING).update(status=Job.CANCELLED, finished_at=now()):
+        delete_job_files(job, JobFile.INPUT)
+        return True
+    return bool(Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(cancel_requested=True))
+
+
+def retry_job(job):
+    if job.kind in INPUT_KINDS:
+        # The upload was deleted when the job failed or was cancelled
+        return False
+    return bool(Job.objects.filter(pk=job.pk, status__in=[Job.FAILED, Job.CANCELLED]).update(
+        status=Job.PENDING, attempts=0, cancel_requested=False, error='', worker='',
+        progress_current=0, run_after=now(), finished_at=None,
+    ))
+
+
+# Handlers import pandas/reportlab lazily, so web workers that only enqueue jobs never load them
+def run_csv_import(job):
+    from .csv_import import import_transactions_csv, CSVImportError
+
+    # The upload is read back a chunk at a time: once to count lines, once to import
+    with open_job_file(job, JobFile.INPUT) as csv_file:
+        lines = sum(chunk.count(b'\n') for chunk in iter(lambda: csv_file.read(CHUNK_SIZE), b''))
+    job.report_progress(0, total=max(lines - 1, 0))
+
+    def progress(result):
+        if job.report_progress(result.created + result.skipped):
+            raise JobCancelled()
+
+    with open_job_file(job, JobFile.INPUT) as csv_file:
+        try:
+            result = import_transactions_csv(job.wallet, csv_file, progress=progress)
+        except CSVImportError as e:
+            raise JobFailed(str(e))
+    job.result = result.as_dict()
+    job.progress_current = result.created + result.skipped
+
+
+def run_pdf_statement(job):
+    from .statements import write_transaction_pdf
+
+    period = {name: date.fromisoformat(value) for name, value in job.params.items() if name in ('start_date', 'end_date')}
+    def progress(rows):
+        # Also the heartbeat, so a long statement isn't requeued while it is still rendering
+        job.progress_current = rows
+        if job.report_progress(rows):
+            raise JobCancelled()
+
+    # Rendered page by page into a local temporary file, then stored as chunks for JobResultView
+    with tempfile.TemporaryFile() as output:
+        write_transaction_pdf(job.wallet, output, progress=progress, **period)
+        output.seek(0)
+        write_job_file(job, JobFile.RESULT, output)
+    job.result_filename = 'transaction_history.pdf'
+    job.result_content_type = 'application/pdf'
+
+
+# Kinds that read an uploaded input file
+INPUT_KINDS = {'csv_import'}
+
+JOB_HANDLERS = {
+    'csv_import': run_csv_import,
+    'pdf_statement': run_pdf_statement,
+}
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils.timezone import localdate
+from api.archive import archive_wallet, restore_wallet
+from api.models import Transaction, TransactionArchive
+from api.partitioning import month_start
+
+
+class Command(BaseCommand):
+    help = (
+        "Move transactions older than a cut-off into compressed per-month archives, keeping "
+        "each wallet's archived totals as a carry-forward row so balances stay correct. "
+        "The cut-off is rounded down to the start of a month, so archival empties whole partitions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help="Archive transactions dated before this day (YYYY-MM-DD).")
+        parser.add_argument('--older-than-days', type=int, default=settings.TRANSACTION_ARCHIVE_AFTER_DAYS,
+                            help="Cut-off as an age in days, when --before is not given.")
+        parser.add_argument('--wallet', type=int, action='append', dest='wallets',
+                            help="Only this wallet id (may be repeated).")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be archived.")
+        parser.add_argument('--restore', action='store_true',
+                            help="Move the archived transactions back instead.")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            self._restore(options['wallets'])
+            return
+
+        before = month_start(options['before'] or localdate() - timedelta(days=options['older_than_days']))
+        old = Transaction.objects.filter(date__lt=before)
+        if options['wallets']:
+            old = old.filter(wallet_id__in=options['wallets'])
+        wallets = old.values('wallet_id').annotate(count=Count('id')).order_by('wallet_id')
+
+        if options['dry_run']:
+            counts = list(wallets)
+            total = sum(row['count'] for row in counts)
+            self.stdout.write(f"{total} transactions in {len(counts)} wallets are dated before {before}.")
+            return
+
+        archived, archives, raw_bytes, stored_bytes = 0, 0, 0, 0
+        # One transaction per wallet, so each wallet is locked only while its own rows move
+        for wallet_id in [row['wallet_id'] for row in wallets]:
+            result = archive_wallet(wallet_id, before)
+            archived += result.transactions
+            archives += result.archives
+            raw_bytes += result.raw_bytes
+            stored_bytes += result.stored_bytes
+            self.stdout.write(f"Wallet {wallet_id}: archived {result.transactions} transactions")
+        ratio = f", {raw_bytes / stored_bytes:.1f}x compressed" if stored_bytes else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} transactions dated before {before} into {archives} monthly archives "
+            f"({stored_bytes / 1024:.0f} KiB{ratio})."
+        ))
+
+    def _restore(self, wallet_ids):
+        archives = TransactionArchive.objects.all()
+        if wallet_ids:
+            archives = archives.filter(wallet_id__in=wallet_ids)
+        wallet_ids = archives.values_list('wallet_id', flat=True).distinct().order_by('wallet_id')
+        if not wallet_ids:
+            raise CommandError("No archived transactions to restore.")
+        restored = sum(restore_wallet(wallet_id) for wallet_id in list(wallet_ids))
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} transactions."))
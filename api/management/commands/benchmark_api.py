@@ -0,0 +1,176 @@
+import json
+import platform
+import random
+import tempfile
+from datetime import date, timedelta
+import django
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from django.test import Client, override_settings
+from django.utils.timezone import now
+from api.authentication import tokens_for_user
+from api.benchmarking import DATE_DISTRIBUTIONS, SAMPLE_DESCRIPTIONS, seed_wallets, summarize, time_call
+from api.models import Wallet
+from api.statement_cache import invalidate_wallet_statements
+
+PASSWORD = 'benchmark-Passw0rd!'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users and transactions at one or more data sizes and measure latency "
+        "(p50/p95/p99) and throughput of the main API endpoints and the admin CSV import, "
+        "in-process against the configured database. Each size runs in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10x100,100x1000',
+                            help="Comma-separated USERSxTRANSACTIONS_PER_USER data sizes.")
+        parser.add_argument('--repeat', type=int, default=20, help="Requests per endpoint and size.")
+        parser.add_argument('--days', type=int, default=730, help="Span of seeded transaction dates.")
+        parser.add_argument('--date-distribution', choices=sorted(DATE_DISTRIBUTIONS), default='uniform')
+        parser.add_argument('--credit-ratio', type=float, default=0.3)
+        parser.add_argument('--csv-rows', type=int, default=1000, help="Rows per admin CSV upload.")
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--baseline', help="Compare p95 latencies against a previous --output file.")
+
+    def handle(self, *args, **options):
+        sizes = [self._parse_size(size) for size in options['sizes'].split(',')]
+        results = {
+            'meta': {
+                'started_at': now().isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'options': {name: options[name] for name in (
+                    'sizes', 'repeat', 'days', 'date_distribution', 'credit_ratio', 'csv_rows',
+                )},
+            },
+            'runs': [],
+        }
+
+        for users, per_user in sizes:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{users} users x {per_user} transactions"))
+            # Fresh caches per size, so ids reused after a rollback never hit stale entries
+            with tempfile.TemporaryDirectory() as statement_dir, override_settings(
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                    'LOCATION': f'benchmark-{users}x{per_user}'}},
+                STATEMENT_CACHE_DIR=statement_dir,
+                JOBS_RUN_INLINE=True,
+            ):
+                endpoints = self._run_size(users, per_user, options)
+            results['runs'].append({
+                'users': users, 'transactions_per_user': per_user, 'transactions': users * per_user,
+                'endpoints': endpoints,
+            })
+            self._report(endpoints)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"\nResults written to {options['output']}")
+        if options['baseline']:
+            self._compare(options['baseline'], results)
+
+    def _parse_size(self, size):
+        try:
+            users, per_user = (int(part) for part in size.lower().split('x'))
+        except ValueError:
+            raise CommandError(f"Invalid size {size!r}, expected USERSxTRANSACTIONS_PER_USER")
+        return users, per_user
+
+    def _run_size(self, users, per_user, options):
+        repeat = options['repeat']
+        with db_transaction.atomic():
+            wallet_ids = seed_wallets(
+                users, per_user, days=options['days'], credit_ratio=options['credit_ratio'],
+                date_distribution=options['date_distribution'], prefix='bench-api',
+            )
+            wallet = Wallet.objects.select_related('user').get(pk=wallet_ids[len(wallet_ids) // 2])
+            wallet.user.set_password(PASSWORD)
+            wallet.user.save(update_fields=['password'])
+            admin = User.objects.create_superuser('bench-api-admin', password=PASSWORD)
+
+            client = Client()
+            auth = {'HTTP_AUTHORIZATION': f"Bearer {tokens_for_user(wallet.user, wallet.pk).access_token}"}
+            usernames = (f"bench-api-new-{i}" for i in range(repeat))
+            admin_client = Client()
+            admin_client.force_login(admin)
+            csv_data = self._csv(options['csv_rows'])
+
+            def pdf():
+                # Measure rendering, not the statement cache
+                invalidate_wallet_statements(wallet.pk)
+                response = client.get('/api/transactions/pdf/', **auth)
+                b''.join(response.streaming_content)
+                return response
+
+            def csv_import():
+                upload = SimpleUploadedFile('transactions.csv', csv_data, content_type='text/csv')
+                return admin_client.post(f'/admin/api/wallet/upload-csv/{wallet.pk}/', {'csv_file': upload})
+
+            calls = {
+                'register': lambda: client.post(
+                    '/api/register/', {'username': next(usernames), 'password': PASSWORD}, content_type='application/json',
+                ),
+                'login': lambda: client.post(
+                    '/api/login/', {'username': wallet.user.username, 'password': PASSWORD}, content_type='application/json',
+                ),
+                'wallet': lambda: client.get('/api/wallet/', **auth),
+                'transactions': lambda: client.get('/api/transactions/', **auth),
+                'transactions/pdf': pdf,
+                'admin csv import': csv_import,
+            }
+            endpoints = {}
+            for name, call in calls.items():
+                timing = summarize(time_call(self._checked(name, call), repeat))
+                timing['throughput_rps'] = 1000 / timing['mean_ms'] if timing['mean_ms'] else None
+                endpoints[name] = timing
+            db_transaction.set_rollback(True)
+        return endpoints
+
+    def _checked(self, name, call):
+        def run():
+            response = call()
+            if response.status_code >= 400:
+                raise CommandError(f"{name} returned HTTP {response.status_code}: {response.content[:200]!r}")
+        return run
+
+    def _csv(self, rows):
+        rng = random.Random(0)
+        start = date.today() - timedelta(days=365)
+        lines = ["description,amount,transaction_type,date"]
+        for _ in range(rows):
+            day = start + timedelta(days=rng.randrange(365))
+            lines.append(
+                f"{rng.choice(SAMPLE_DESCRIPTIONS)},{rng.randrange(100, 50000) / 100:.2f},"
+                f"{rng.choice(['credit', 'debit'])},{day:%d-%m-%Y}"
+            )
+        return "\n".join(lines).encode()
+
+    def _report(self, endpoints):
+        self.stdout.write(f"{'endpoint':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+        for name, timing in endpoints.items():
+            self.stdout.write(
+                f"{name:<20}{timing['p50_ms']:>10.2f}{timing['p95_ms']:>10.2f}{timing['p99_ms']:>10.2f}"
+                f"{timing['throughput_rps']:>10.1f}"
+            )
+
+    def _compare(self, path, results):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        previous = {(run['users'], run['transactions_per_user']): run['endpoints'] for run in baseline['runs']}
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\np95 compared to {path}"))
+        for run in results['runs']:
+            before = previous.get((run['users'], run['transactions_per_user']))
+            if before is None:
+                continue
+            for name, timing in run['endpoints'].items():
+                if name not in before:
+                    continue
+                ratio = timing['p95_ms'] / before[name]['p95_ms'] if before[name]['p95_ms'] else float('inf')
+                line = f"{run['users']}x{run['transactions_per_user']} {name:<20}{before[name]['p95_ms']:>10.2f} -> {timing['p95_ms']:.2f} ms ({ratio:.2f}x)"
+                self.stdout.write(self.style.WARNING(line) if ratio > 1.2 else line)
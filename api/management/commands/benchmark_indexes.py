@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q, Sum
+from api.benchmarking import seed_wallets, summarize, time_call
+from api.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway dataset and compare query plans and timings of the wallet "
+        "history/aggregate queries with and without the composite transaction indexes. "
+        "Everything runs in one transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--per-user', type=int, default=10000,
+                            help="Transactions per user (default 200 x 10000 = 2M rows).")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with db_transaction.atomic():
+            self.stdout.write(f"Seeding {options['users'] * options['per_user']:,} transactions...")
+            wallet_ids = seed_wallets(options['users'], options['per_user'], prefix='bench-idx')
+            wallet_id = wallet_ids[len(wallet_ids) // 2]
+            self.analyze()
+
+            queries = self.queries(wallet_id)
+            after = self.measure(queries, options['repeat'])
+
+            self.swap_indexes()
+            self.analyze()
+            before = self.measure(queries, options['repeat'])
+
+            self.report(before, after)
+            db_transaction.set_rollback(True)
+
+    def queries(self, wallet_id):
+        wallet_rows = Transaction.objects.filter(wallet_id=wallet_id)
+        middle = wallet_rows.order_by('-date', '-id').values('date', 'id')[wallet_rows.count() // 2]
+        page_columns = ('id', 'date', 'description', 'amount', 'transaction_type')
+        return {
+            'history first page': wallet_rows.order_by('-date', '-id').values(*page_columns)[:50],
+            'history deep page': wallet_rows.filter(
+                Q(date__lt=middle['date']) | Q(date=middle['date'], id__lt=middle['id'])
+            ).order_by('-date', '-id').values(*page_columns)[:50],
+            'totals by type': wallet_rows.values('transaction_type').annotate(total=Sum('amount')).order_by(),
+            'debit total': wallet_rows.filter(transaction_type='debit').values('wallet_id').annotate(
+                total=Sum('amount')).order_by(),
+        }
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            results[name] = {
+                'plan': queryset.explain(),
+                'timing': summarize(time_call(lambda: list(queryset.all()), repeat)),
+            }
+        return results
+
+    def swap_indexes(self):
+        # Back to the pre-0007 schema: only the implicit foreign key index on wallet_id
+        quote = connection.ops.quote_name
+        table = Transaction._meta.db_table
+        with connection.cursor() as cursor:
+            for index in Transaction._meta.indexes:
+                cursor.execute(f"DROP INDEX {quote(index.name)}")
+            cursor.execute(f"CREATE INDEX {quote('api_txn_bench_wallet_fk')} ON {quote(table)} ({quote('wallet_id')})")
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Transaction._meta.db_table}")
+
+    def report(self, before, after):
+        for name in before:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            self.stdout.write(f"  before:\n    {before[name]['plan'].replace(chr(10), chr(10) + '    ')}")
+            self.stdout.write(f"  after:\n    {after[name]['plan'].replace(chr(10), chr(10) + '    ')}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nTimings (ms)"))
+        self.stdout.write(f"{'query':<22}{'p50 before':>12}{'p50 after':>12}{'p95 before':>12}{'p95 after':>12}{'speedup':>10}")
+        for name in before:
+            b, a = before[name]['timing'], after[name]['timing']
+            speedup = b['p50_ms'] / a['p50_ms'] if a['p50_ms'] else float('inf')
+            self.stdout.write(
+                f"{name:<22}{b['p50_ms']:>12.2f}{a['p50_ms']:>12.2f}{b['p95_ms']:>12.2f}{a['p95_ms']:>12.2f}{speedup:>9.1f}x"
+            )
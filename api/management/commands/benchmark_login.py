@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from rest_framework.test import APIRequestFactory
+from api.views import login_user
+
+PASSWORD = 'benchmark-Passw0rd!'
+
+
+def _verify_loop(args):
+    # Runs in a forked child: pure CPU, no database access
+    encoded, seconds = args
+    count, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        check_password(PASSWORD, encoded)
+        count += 1
+    return count
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password verifications/sec per core for each configured hasher, and "
+        "end-to-end login_user requests/sec with the preferred one, to size login capacity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0, help="Duration of each measurement.")
+        parser.add_argument('--processes', type=int, default=1,
+                            help="Hash in this many processes at once to check scaling across cores.")
+        parser.add_argument('--json', action='store_true', help="Print machine-readable results.")
+
+    def handle(self, *args, **options):
+        results = {'hashers': [], 'login': None}
+        for algorithm in ('pbkdf2_sha256', 'scrypt', 'argon2'):
+            try:
+                hasher = get_hasher(algorithm)
+                encoded = make_password(PASSWORD, hasher=algorithm)
+            except ValueError as e:
+                # e.g. argon2-cffi is not installed
+                self.stderr.write(f"Skipping {algorithm}: {e}")
+                continue
+            total = self._run_parallel(encoded, options['seconds'], options['processes'])
+            per_core = total / options['seconds'] / options['processes']
+            results['hashers'].append({
+                'algorithm': algorithm,
+                'parameters': {k: str(v) for k, v in hasher.safe_summary(encoded).items() if k not in ('salt', 'hash')},
+                'processes': options['processes'],
+                'verifications_per_sec': total / options['seconds'],
+                'verifications_per_sec_per_core': per_core,
+            })
+
+        results['login'] = self._measure_login(options['seconds'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"Preferred hasher: {settings.PASSWORD_HASHER}")
+        for row in results['hashers']:
+            self.stdout.write(
+                f"{row['algorithm']:<15}{row['verifications_per_sec_per_core']:>10.1f} verifications/sec/core  {row['parameters']}"
+            )
+        login = results['login']
+        self.stdout.write(
+            f"login_user: {login['logins_per_sec']:.1f} logins/sec on one core "
+            f"(mean {login['mean_ms']:.1f} ms, {login['requests']} requests)"
+        )
+
+    def _run_parallel(self, encoded, seconds, processes):
+        if processes == 1:
+            return _verify_loop((encoded, seconds))
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            return sum(pool.map(_verify_loop, [(encoded, seconds)] * processes))
+
+    def _measure_login(self, seconds):
+        factory = APIRequestFactory()
+        with db_transaction.atomic():
+            # Throwaway user, rolled back with everything else at the end
+            User.objects.create_user(username='benchmark-login-user', password=PASSWORD)
+            body = {'username': 'benchmark-login-user', 'password': PASSWORD}
+            requests, deadline = 0, time.perf_counter() + seconds
+            started = time.perf_counter()
+            while time.perf_counter() < deadline:
+                response = login_user(factory.post('/api/login/', body, format='json'))
+                assert response.status_code == 200, response.data
+                requests += 1
+            elapsed = time.perf_counter() - started
+            db_transaction.set_rollback(True)
+        return {'requests': requests, 'logins_per_sec': requests / elapsed, 'mean_ms': elapsed / requests * 1000}
@@ -0,0 +1,89 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+HEAVY_MODULES = ('pandas', 'numpy', 'reportlab')
+
+# Runs in a fresh interpreter: what a gunicorn/uvicorn worker does before serving
+# its first request (settings, app registry, admin autodiscovery, URLconf and views)
+BOOT_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+from {module} import {factory}
+application = {factory}()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({{
+    'boot_ms': (time.perf_counter() - started) * 1000,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+SERVERS = {
+    'wsgi': {'module': 'django.core.wsgi', 'factory': 'get_wsgi_application'},
+    'asgi': {'module': 'django.core.asgi', 'factory': 'get_asgi_application'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker start-up: import time, peak RSS and which heavy libraries "
+        "(pandas, numpy, reportlab) get loaded before the first request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to start per server type.")
+        parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                            help="Also list the N slowest top-level imports (python -X importtime).")
+        parser.add_argument('--json', action='store_true', help="Print machine-readable results.")
+
+    def handle(self, *args, **options):
+        results = {}
+        for server, names in SERVERS.items():
+            runs = [self._boot(names) for _ in range(options['runs'])]
+            results[server] = {
+                'boot_ms_median': statistics.median(run['boot_ms'] for run in runs),
+                'max_rss_mb_median': statistics.median(run['max_rss_mb'] for run in runs),
+                'modules': runs[-1]['modules'],
+                'heavy_modules': runs[-1]['heavy_modules'],
+            }
+        if options['importtime']:
+            results['slowest_imports'] = self._importtime(options['importtime'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for server in SERVERS:
+            row = results[server]
+            self.stdout.write(
+                f"{server}: {row['boot_ms_median']:.0f} ms to boot, {row['max_rss_mb_median']:.1f} MB peak RSS, "
+                f"{row['modules']} modules, heavy: {', '.join(row['heavy_modules']) or 'none'}"
+            )
+        for module, cumulative_ms in results.get('slowest_imports', []):
+            self.stdout.write(f"  {cumulative_ms:>8.1f} ms  {module}")
+
+    def _run(self, script, *flags):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')}
+        process = subprocess.run([sys.executable, *flags, '-c', script], capture_output=True, text=True, env=env)
+        if process.returncode:
+            raise CommandError(process.stderr.strip().splitlines()[-1])
+        return process
+
+    def _boot(self, names):
+        return json.loads(self._run(BOOT_SCRIPT.format(heavy=HEAVY_MODULES, **names)).stdout)
+
+    def _importtime(self, limit):
+        stderr = self._run(BOOT_SCRIPT.format(heavy=HEAVY_MODULES, **SERVERS['wsgi']), '-X', 'importtime').stderr
+        # "import time: self [us] | cumulative | imported package", nesting shown by indentation
+        top_level = []
+        for line in stderr.splitlines():
+            match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+            if match and not match.group(2):
+                top_level.append((match.group(3), int(match.group(1)) / 1000))
+        return sorted(top_level, key=lambda item: item[1], reverse=True)[:limit]
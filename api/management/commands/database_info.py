@@ -0,0 +1,77 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the effective database connection settings (persistent connections, health "
+        "checks, pooling) and, with --connect, how long connection setup takes compared to reuse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--connect', action='store_true',
+                            help="Open a connection and time the first query against a reused one.")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        config = connection.settings_dict
+        pool = config.get('OPTIONS', {}).get('pool')
+        processes = getattr(settings, 'WEB_CONCURRENCY', 1)
+
+        self.stdout.write(f"Database:           {options['database']} ({connection.vendor}, {config['ENGINE']})")
+        self.stdout.write(f"Host:               {config.get('HOST') or 'local'}")
+        self.stdout.write(f"Driver:             {self._driver(connection)}")
+        self.stdout.write(f"SSL:                {config.get('OPTIONS', {}).get('sslmode', 'not required')}")
+        self.stdout.write(f"CONN_MAX_AGE:       {self._max_age(config['CONN_MAX_AGE'])}")
+        self.stdout.write(f"CONN_HEALTH_CHECKS: {config['CONN_HEALTH_CHECKS']}")
+        if pool:
+            max_size = pool.get('max_size', 'unbounded') if isinstance(pool, dict) else 'driver default'
+            self.stdout.write(f"Pool:               {pool}")
+            self.stdout.write(
+                f"Pool capacity:      {max_size} per process x {processes} web processes "
+                f"(budget {getattr(settings, 'DB_CONNECTION_BUDGET', 'unset')})"
+            )
+        else:
+            self.stdout.write("Pool:               disabled")
+        if options['database'] == 'default' and settings.DATABASE_REPLICAS:
+            self.stdout.write(
+                f"Read replicas:      {', '.join(settings.DATABASE_REPLICAS)} "
+                f"(read-your-writes for {settings.REPLICA_STICKY_SECONDS}s)"
+            )
+
+        if pool and connection.vendor == 'postgresql' and connection.Database.__name__ == 'psycopg2':
+            self.stdout.write(self.style.ERROR("DB_POOL requires psycopg 3 with psycopg-pool; psycopg2 is installed."))
+        if not pool and config['CONN_MAX_AGE'] == 0 and connection.vendor != 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "Every request opens a new connection: set DB_CONN_MAX_AGE or enable DB_POOL."
+            ))
+
+        if options['connect']:
+            self._time_connection(connection)
+
+    def _driver(self, connection):
+        if connection.vendor != 'postgresql':
+            return connection.Database.__name__
+        return f"{connection.Database.__name__} {connection.Database.__version__.split()[0]}"
+
+    def _max_age(self, max_age):
+        if max_age is None:
+            return "unlimited (persistent)"
+        if max_age == 0:
+            return "0 (closed after every request)"
+        return f"{max_age}s (persistent)"
+
+    def _time_connection(self, connection):
+        connection.close()
+        timings = []
+        for _ in range(2):
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(f"First query:        {timings[0]:.2f} ms (includes connection setup)")
+        self.stdout.write(f"Reused connection:  {timings[1]:.2f} ms")
+        connection.close()
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction as db_transaction
+from django.utils.timezone import localdate
+from api import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage monthly range partitions of the transactions table on PostgreSQL: convert "
+        "the table once with --convert, then run regularly to create the coming months' "
+        "partitions. Does nothing unless TRANSACTION_PARTITIONING is set, on other databases, "
+        "or before the table is partitioned."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--convert', action='store_true',
+                            help="Rebuild the table as a partitioned one. Locks it while the rows are copied.")
+        parser.add_argument('--months-ahead', type=int, default=settings.TRANSACTION_PARTITION_MONTHS_AHEAD,
+                            help="Create partitions up to this many months after the current one.")
+        parser.add_argument('--drop-empty', action='store_true',
+                            help="Drop empty partitions of past months, e.g. after archive_transactions.")
+        parser.add_argument('--list', action='store_true', help="List the partitions with estimated row counts.")
+
+    def handle(self, *args, **options):
+        if not settings.TRANSACTION_PARTITIONING:
+            self.stdout.write("TRANSACTION_PARTITIONING is not set; nothing to do.")
+            return
+        connection = connections[options['database']]
+        current = partitioning.month_start(localdate())
+        last = partitioning.add_months(current, options['months_ahead'])
+
+        if not partitioning.is_partitioned(connection):
+            if not options['convert']:
+                self.stdout.write(f"{partitioning.TABLE} is not partitioned; nothing to do.")
+                return
+            if connection.vendor != 'postgresql':
+                raise CommandError("Partitioning needs PostgreSQL.")
+            with db_transaction.atomic(using=connection.alias):
+                partitioning.convert_to_partitioned(connection, last)
+            self.stdout.write(self.style.SUCCESS(f"Converted {partitioning.TABLE} to monthly partitions."))
+
+        with db_transaction.atomic(using=connection.alias):
+            created = partitioning.create_partitions(connection, current, last)
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        if options['drop_empty']:
+            with db_transaction.atomic(using=connection.alias):
+                dropped = partitioning.drop_empty_partitions(connection, current)
+            for name in dropped:
+                self.stdout.write(f"Dropped {name}")
+
+        if options['list']:
+            for name, bounds, rows in partitioning.list_partitions(connection):
+                self.stdout.write(f"{name:<32}{rows:>12}  {bounds}")
+        self.stdout.write(self.style.SUCCESS(f"Partitions exist through {last:%Y-%m}."))
@@ -0,0 +1,27 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from api.models import BalanceSnapshot, DailySummary, Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-day credit/debit rollups (analytics/periods) and the daily "
+        "balance snapshots built from them (balance-history)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallet', type=int, action='append', dest='wallets',
+                            help="Only rebuild this wallet id (may be repeated).")
+
+    def handle(self, *args, **options):
+        created = DailySummary.objects.rebuild(wallet_ids=options['wallets'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily summaries."))
+
+        wallets = Wallet.objects.order_by('pk')
+        if options['wallets']:
+            wallets = wallets.filter(pk__in=options['wallets'])
+        for wallet_id in wallets.values_list('pk', flat=True).iterator():
+            with db_transaction.atomic():
+                BalanceSnapshot.objects.recompute_from(wallet_id, date.min)
+        self.stdout.write(self.style.SUCCESS("Rebuilt balance snapshots."))
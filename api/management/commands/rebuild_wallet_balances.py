@@ -0,0 +1,82 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.db.models import F, Q, Sum
+from django.utils.timezone import now
+from api.models import Wallet, Transaction, WalletCarryForward
+from api.wallet_cache import invalidate_wallet_summary
+
+
+class Command(BaseCommand):
+    help = "Recompute the running credit/debit/balance totals on every wallet and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallet', type=int, action='append', dest='wallets',
+                            help="Only rebuild this wallet id (may be repeated).")
+        parser.add_argument('--check', action='store_true',
+                            help="Verify only; exit non-zero if any wallet has drifted.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        wallets = Wallet.objects.order_by('pk')
+        if options['wallets']:
+            wallets = wallets.filter(pk__in=options['wallets'])
+        wallet_ids = list(wallets.values_list('pk', flat=True))
+
+        checked = 0
+        drifted = []
+        batch_size = options['batch_size']
+        for start in range(0, len(wallet_ids), batch_size):
+            batch = wallet_ids[start:start + batch_size]
+            # The wallet rows stay locked from reading the ledger until the corrected totals are
+            # written, so a concurrent transaction's F() increment can't be overwritten in between
+            with db_transaction.atomic():
+                locked = list(
+                    Wallet.objects.select_for_update().filter(pk__in=batch).order_by('pk')
+                    .only('pk', 'user_id', 'total_credits', 'total_debits', 'balance')
+                )
+                expected = self._expected_totals(batch)
+                batch_drifted = []
+                for wallet in locked:
+                    checked += 1
+                    credits, debits = expected.get(wallet.pk, (Decimal('0'), Decimal('0')))
+                    if (wallet.total_credits, wallet.total_debits, wallet.balance) != (credits, debits, debits - credits):
+                        self.stdout.write(
+                            f"Wallet {wallet.pk}: stored balance {wallet.balance}, expected {debits - credits}"
+                        )
+                        wallet.total_credits, wallet.total_debits = credits, debits
+                        wallet.balance = debits - credits
+                        batch_drifted.append(wallet)
+                if batch_drifted and not options['check']:
+                    Wallet.objects.bulk_update(batch_drifted, ['total_credits', 'total_debits', 'balance'])
+                    # Corrected balances must not be served from cached statements
+                    Wallet.objects.filter(pk__in=[wallet.pk for wallet in batch_drifted]).update(
+                        version=F('version') + 1, updated_at=now()
+                    )
+            drifted.extend(batch_drifted)
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f"{len(drifted)} of {checked} wallets have drifted balances.")
+            self.stdout.write(self.style.SUCCESS(f"All {checked} wallet balances verified."))
+            return
+
+        for wallet in drifted:
+            invalidate_wallet_summary(wallet.user_id)
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} wallets, rebuilt {len(drifted)}."))
+
+    def _expected_totals(self, wallet_ids):
+        # One grouped query per batch instead of two aggregates per wallet
+        expected = {
+            row['wallet_id']: (row['credits'] or Decimal('0'), row['debits'] or Decimal('0'))
+            for row in Transaction.objects.filter(wallet_id__in=wallet_ids).values('wallet_id').annotate(
+                credits=Sum('amount', filter=Q(transaction_type='credit')),
+                debits=Sum('amount', filter=Q(transaction_type='debit')),
+            ).order_by()
+        }
+        # Archived transactions count through their carried-forward totals
+        carry_forwards = WalletCarryForward.objects.filter(wallet_id__in=wallet_ids)
+        for wallet_id, carried_credits, carried_debits in carry_forwards.values_list('wallet_id', 'credits', 'debits'):
+            credits, debits = expected.get(wallet_id, (Decimal('0'), Decimal('0')))
+            expected[wallet_id] = (credits + carried_credits, debits + carried_debits)
+        return expected
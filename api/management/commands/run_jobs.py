@@ -0,0 +1,49 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.jobs import claim_jobs, requeue_stale_jobs
+from api.worker import init_worker, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (CSV imports, PDF statements) in a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'JOBS_WORKER_PROCESSES', 2))
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help="Requeue running jobs without a heartbeat for this many seconds.")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is drained instead of polling forever.")
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Job worker {worker} starting with {processes} processes")
+
+        # Spawned (not forked) children so no process inherits the parent's DB connection
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_worker) as pool:
+            running = {}
+            while True:
+                for future in [future for future in running if future.done()]:
+                    job_id = running.pop(future)
+                    if future.exception():
+                        self.stderr.write(f"Job {job_id} crashed: {future.exception()}")
+                    else:
+                        self.stdout.write(f"Job {job_id} done")
+
+                requeue_stale_jobs(options['stale_after'])
+                claimed = claim_jobs(processes - len(running), worker)
+                for job_id in claimed:
+                    running[pool.submit(run_job, job_id)] = job_id
+
+                if options['once'] and not claimed and not running:
+                    break
+                if not claimed:
+                    time.sleep(options['poll_interval'] if not running else 0.2)
@@ -0,0 +1,146 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Per-view request histograms, filled by api.middleware.RequestMetricsMiddleware and
+# exposed in the Prometheus text format by the metrics view. They live in process
+# memory, so each worker process reports its own series; scrape every process or
+# aggregate with the `instance` label.
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+MAX_RECORDED_QUERIES = 100
+# Any other request method is labelled 'other', so clients can't mint new series
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'}
+
+HISTOGRAMS = {
+    # name: (help, buckets)
+    'finance_request_duration_seconds': ("Total time spent handling the request.", SECONDS_BUCKETS),
+    'finance_request_db_seconds': ("Time spent executing SQL during the request.", SECONDS_BUCKETS),
+    'finance_request_serialization_seconds': ("Time spent rendering the response body.", SECONDS_BUCKETS),
+    'finance_request_queries': ("Number of SQL queries issued by the request.", QUERY_BUCKETS),
+}
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+    sql: list = field(default_factory=list)
+
+
+current_request = ContextVar('current_request_stats', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, method, stats, duration):
+        values = {
+            'finance_request_duration_seconds': duration,
+            'finance_request_db_seconds': stats.db_seconds,
+            'finance_request_serialization_seconds': stats.serialization_seconds,
+            'finance_request_queries': stats.queries,
+        }
+        method = method if method in HTTP_METHODS else 'other'
+        with self._lock:
+            for name, value in values.items():
+                key = (name, view, method)
+                if key not in self._series:
+                    self._series[key] = Histogram(HISTOGRAMS[name][1])
+                self._series[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets) in HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (series, view, method), histogram in sorted(self._series.items()):
+                    if series != name:
+                        continue
+                    labels = f'view="{_escape(view)}",method="{_escape(method)}"'
+                    cumulative = 0
+                    for bound, count in zip((*buckets, '+Inf'), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection; only counts while a request is being measured.
+    # The context variable follows the request into sync_to_async threads.
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if len(stats.sql) < MAX_RECORDED_QUERIES:
+            stats.sql.append((elapsed, sql))
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+@contextmanager
+def assert_max_queries(limit, using='default'):
+    """
+    Fail when the block issues more than `limit` queries, listing the SQL.
+
+    For tests guarding against N+1 regressions, e.g.
+
+        with assert_max_queries(2):
+            client.get('/api/transactions/')
+    """
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > limit:
+        statements = "\n".join(f"{i}. {query['sql']}" for i, query in enumerate(captured.captured_queries, 1))
+        raise AssertionError(f"{len(captured)} queries executed, at most {limit} expected:\n{statements}")
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
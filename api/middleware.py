@@ -0,0 +1,129 @@
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .db_routers import RequestRouting, current_routing, pin_to_primary
+from .metrics import RequestStats, current_request, registry
+
+logger = logging.getLogger('api.slow_requests')
+
+UNMATCHED_VIEW = 'unmatched'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestMetricsMiddleware:
+    """
+    Record query count, SQL time, rendering time and total latency per view.
+
+    Keep it first in MIDDLEWARE so the latency covers the whole stack. Requests
+    slower than SLOW_REQUEST_SECONDS are logged with their slowest queries.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self._record(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self._record(request, response, stats)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that as serialization
+        stats = current_request.get()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.serialization_seconds += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def _record(self, request, response, stats):
+        match = request.resolver_match
+        view = match.view_name if match else UNMATCHED_VIEW
+        if view in settings.METRICS_EXCLUDED_VIEWS:
+            return
+        duration = time.perf_counter() - stats.started
+        registry.observe(view, request.method, stats, duration)
+
+        if duration >= settings.SLOW_REQUEST_SECONDS:
+            slowest = sorted(stats.sql, reverse=True)[:settings.SLOW_REQUEST_LOGGED_QUERIES]
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms in SQL, %.0f ms serializing, status %s\n%s",
+                request.method, request.path, view, duration * 1000, stats.queries, stats.db_seconds * 1000,
+                stats.serialization_seconds * 1000, response.status_code,
+                "\n".join(f"  {elapsed * 1000:.1f} ms  {sql}" for elapsed, sql in slowest),
+            )
+
+
+class ReadReplicaMiddleware:
+    """
+    Let the read-only views in REPLICA_READ_VIEWS read from a replica (see
+    api/db_routers.py), and keep a user on the primary for REPLICA_STICKY_SECONDS
+    after any successful write request they make.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_routing.set(RequestRouting(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        self._pin_writer(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = current_routing.set(RequestRouting(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        self._pin_writer(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = current_routing.get()
+        if (
+            routing is not None and settings.DATABASE_REPLICAS and request.method in SAFE_METHODS
+            and request.resolver_match.view_name in settings.REPLICA_READ_VIEWS
+        ):
+            routing.use_replica = True
+
+    def _pin_writer(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        # DRF stores the token user on the request while authenticating
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:28
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def populate_running_totals(apps, schema_editor):
+    Wallet = apps.get_model('api', 'Wallet')
+    Transaction = apps.get_model('api', 'Transaction')
+    totals = (
+        Transaction.objects.values('wallet_id')
+        .annotate(
+            credits=Sum('amount', filter=Q(transaction_type='credit')),
+            debits=Sum('amount', filter=Q(transaction_type='debit')),
+        )
+        .order_by()
+    )
+    for row in totals:
+        credits = row['credits'] or 0
+        debits = row['debits'] or 0
+        Wallet.objects.filter(pk=row['wallet_id']).update(
+            total_credits=credits,
+            total_debits=debits,
+            balance=debits - credits,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_remove_wallet_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='total_credits',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='total_debits',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(populate_running_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_wallet_running_totals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='wallet',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='api.wallet'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', '-date', '-id'], name='api_txn_wallet_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', 'transaction_type', 'amount'], name='api_txn_wallet_type_amount'),
+        ),
+    ]
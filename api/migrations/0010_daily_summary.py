@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_daily_summaries(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    DailySummary = apps.get_model('api', 'DailySummary')
+    rows = Transaction.objects.values('wallet_id', 'date').annotate(
+        credits=Sum('amount', filter=Q(transaction_type='credit'), default=0),
+        debits=Sum('amount', filter=Q(transaction_type='debit'), default=0),
+        credit_count=Count('id', filter=Q(transaction_type='credit')),
+        debit_count=Count('id', filter=Q(transaction_type='debit')),
+    ).order_by()
+    DailySummary.objects.bulk_create((DailySummary(**row) for row in rows.iterator()), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_wallet_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_count', models.IntegerField(default=0)),
+                ('debit_count', models.IntegerField(default=0)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='api.wallet')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'date'), name='api_dailysummary_wallet_date')],
+            },
+        ),
+        migrations.RunPython(populate_daily_summaries, migrations.RunPython.noop),
+    ]
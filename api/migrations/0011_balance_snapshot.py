@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_balance_snapshots(apps, schema_editor):
+    DailySummary = apps.get_model('api', 'DailySummary')
+    BalanceSnapshot = apps.get_model('api', 'BalanceSnapshot')
+    snapshots, wallet_id, balance = [], None, 0
+    days = DailySummary.objects.order_by('wallet_id', 'date').values_list('wallet_id', 'date', 'credits', 'debits')
+    for day_wallet_id, date, credits, debits in days.iterator():
+        if day_wallet_id != wallet_id:
+            wallet_id, balance = day_wallet_id, 0
+        balance += debits - credits
+        snapshots.append(BalanceSnapshot(wallet_id=wallet_id, date=date, balance=balance))
+        if len(snapshots) >= 2000:
+            BalanceSnapshot.objects.bulk_create(snapshots)
+            snapshots = []
+    BalanceSnapshot.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_daily_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='api.wallet')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'date'), name='api_balancesnapshot_wallet_date')],
+            },
+        ),
+        migrations.RunPython(populate_balance_snapshots, migrations.RunPython.noop),
+    ]
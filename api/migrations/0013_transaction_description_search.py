@@ -0,0 +1,76 @@
+from django.db import OperationalError, migrations
+
+# Description search indexes, which differ per database (see api/search.py).
+# PostgreSQL: a GIN trigram index on UPPER(description), which serves the
+# `icontains` lookups used by the API search and the admin search box.
+# SQLite: an external-content FTS5 table with the trigram tokenizer, kept in step
+# with api_transaction by triggers, skipped when the SQLite build lacks FTS5 trigram.
+
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS api_txn_description_trgm "
+    "ON api_transaction USING gin (UPPER(description) gin_trgm_ops)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX CONCURRENTLY IF EXISTS api_txn_description_trgm",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_transaction_fts USING fts5("
+    "description, content='api_transaction', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER api_transaction_fts_insert AFTER INSERT ON api_transaction BEGIN "
+    "INSERT INTO api_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER api_transaction_fts_delete AFTER DELETE ON api_transaction BEGIN "
+    "INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER api_transaction_fts_update AFTER UPDATE OF description ON api_transaction BEGIN "
+    "INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO api_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO api_transaction_fts(api_transaction_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_transaction_fts_insert",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_update",
+    "DROP TABLE IF EXISTS api_transaction_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite' and not _sqlite_has_fts5_trigram(schema_editor):
+        # api/search.py falls back to icontains when the table is missing
+        return
+    _run({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD})(apps, schema_editor)
+
+
+def _sqlite_has_fts5_trigram(schema_editor):
+    # FTS5 is optional in SQLite builds, and the trigram tokenizer needs 3.34+
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("CREATE VIRTUAL TABLE temp.api_fts5_probe USING fts5(probe, tokenize='trigram')")
+            cursor.execute("DROP TABLE temp.api_fts5_probe")
+    except OperationalError:
+        return False
+    return True
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_transaction_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_search_index,
+            _run({'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_transaction_description_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletCarryForward',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_through', models.DateField()),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_count', models.PositiveIntegerField(default=0)),
+                ('debit_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='carry_forward', to='api.wallet')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('transaction_count', models.PositiveIntegerField()),
+                ('credits', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_archives', to='api.wallet')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['wallet', 'month'], name='api_txnarchive_wallet_month')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models
+
+
+def move_inputs_to_storage(apps, schema_editor):
+    # Jobs that haven't run yet still need their upload. Stored where MEDIA_ROOT pointed by
+    # default; 0017_job_files moves them into the database.
+    Job = apps.get_model('api', 'Job')
+    storage = FileSystemStorage(location=settings.BASE_DIR / 'media')
+    for job in Job.objects.filter(input_data__isnull=False).exclude(status='succeeded').iterator(chunk_size=1):
+        job.input_file = storage.save(f"job-inputs/job-{job.pk}.csv", ContentFile(bytes(job.input_data)))
+        job.save(update_fields=['input_file'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='input_file',
+            field=models.FileField(blank=True, upload_to='job-inputs/%Y/%m/%d/'),
+        ),
+        migrations.RunPython(move_inputs_to_storage, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='job',
+            name='input_data',
+        ),
+    ]
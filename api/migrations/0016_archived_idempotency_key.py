@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_job_input_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=100)),
+                ('wallet', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_idempotency_keys', to='api.wallet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'idempotency_key'), name='api_archivedkey_wallet_key')],
+            },
+        ),
+    ]
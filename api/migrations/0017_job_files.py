@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def move_files_to_database(apps, schema_editor):
+    # Uploads of unfinished jobs (stored on disk by 0015_job_input_file) and results of
+    # succeeded jobs become JobFile chunks
+    Job = apps.get_model('api', 'Job')
+    JobFile = apps.get_model('api', 'JobFile')
+    storage = FileSystemStorage(location=settings.BASE_DIR / 'media')
+    for job in Job.objects.exclude(input_file='').iterator(chunk_size=1):
+        if job.status in ('pending', 'running') and storage.exists(job.input_file.name):
+            with storage.open(job.input_file.name, 'rb') as upload:
+                for index, data in enumerate(iter(lambda: upload.read(CHUNK_SIZE), b'')):
+                    JobFile.objects.create(job=job, role='input', index=index, data=data)
+        if storage.exists(job.input_file.name):
+            storage.delete(job.input_file.name)
+    results = Job.objects.filter(status='succeeded', result_data__isnull=False)
+    for job_id in list(results.values_list('pk', flat=True)):
+        data = bytes(Job.objects.values_list('result_data', flat=True).get(pk=job_id))
+        for index, start in enumerate(range(0, len(data), CHUNK_SIZE)):
+            JobFile.objects.create(job_id=job_id, role='result', index=index, data=data[start:start + CHUNK_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_archived_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('input', 'Input'), ('result', 'Result')], max_length=10)),
+                ('index', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='api.job')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'role', 'index'), name='api_jobfile_job_role_index')],
+            },
+        ),
+        migrations.RunPython(move_files_to_database, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='job',
+            name='input_file',
+        ),
+        migrations.RemoveField(
+            model_name='job',
+            name='result_data',
+        ),
+    ]
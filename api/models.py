@@ -1,38 +1,395 @@
-from django.db import models
+import datetime
+from decimal import Decimal
+from django.db import IntegrityError, models
+from django.db import transaction as db_transaction
 from django.contrib.auth.models import User
 from django.utils.timezone import now
-from django.db.models import Sum
+from django.db.models import Sum, Q, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 # Create your models here.
 
 class Wallet(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    balance = short_description = 'Balance'
+    # Running totals, kept in step with the wallet's transactions by api.signals.
+    # Rebuild them with `manage.py rebuild_wallet_balances` if they ever drift.
+    total_credits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_debits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Bumped on every transaction write; identifies cached statements/exports of this wallet
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=now)
+
+    def calculate_totals(self):
+        # Sum up credit and debit transactions in a single pass over the wallet
+        totals = self.transactions.aggregate(
+            credits=Sum('amount', filter=Q(transaction_type='credit')),
+            debits=Sum('amount', filter=Q(transaction_type='debit')),
+        )
+        credits, debits = totals['credits'] or Decimal('0'), totals['debits'] or Decimal('0')
+        # Archived transactions only survive as their carried-forward totals
+        carried = WalletCarryForward.objects.filter(wallet=self).values_list('credits', 'debits').first()
+        if carried:
+            credits, debits = credits + carried[0], debits + carried[1]
+        return credits, debits
+
     def calculate_balance(self):
-        # Sum up all debit transactions
-        debit_sum = self.transactions.filter(transaction_type='debit').aggregate(Sum('amount'))['amount__sum'] or 0
-        # Sum up all credit transactions
-        credit_sum = self.transactions.filter(transaction_type='credit').aggregate(Sum('amount'))['amount__sum'] or 0
+        credit_sum, debit_sum = self.calculate_totals()
 
-        # Return the net balance (credits - debits)
+        # Return the net balance (debits - credits)
         return debit_sum - credit_sum
-    def balance(self):
-        return self.calculate_balance()
 
+    def rebuild_totals(self):
+        self.total_credits, self.total_debits = self.calculate_totals()
+        self.balance = self.total_debits - self.total_credits
+        Wallet.objects.filter(pk=self.pk).update(
+            total_credits=self.total_credits,
+            total_debits=self.total_debits,
+            balance=self.balance,
+            version=F('version') + 1,
+            updated_at=now(),
+        )
+
+    @classmethod
+    def adjust_totals(cls, wallet_id, credits=0, debits=0):
+        # Single UPDATE with F() expressions so concurrent writers never lose an increment.
+        # Runs for every transaction write, even zero-amount ones, to bump the version.
+        cls.objects.filter(pk=wallet_id).update(
+            total_credits=F('total_credits') + credits,
+            total_debits=F('total_debits') + debits,
+            balance=F('balance') + debits - credits,
+            version=F('version') + 1,
+            updated_at=now(),
+        )
 
     def __str__(self):
-        return f"{self.user.username}" 
+        return f"{self.user.username}"
+
+
+class TransactionQuerySet(models.QuerySet):
+    def filtered(self, start_date=None, end_date=None, transaction_type=None):
+        # Shared date-range/type filters so every reader pushes them down into SQL
+        queryset = self
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        if transaction_type:
+            queryset = queryset.filter(transaction_type=transaction_type)
+        return queryset
 
 
 class Transaction(models.Model):
-    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transactions")
+    # The composite indexes below lead with wallet, so the plain FK index would be redundant
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transactions", db_index=False)
     date = models.DateField(default=now)
     description = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     transaction_type = models.CharField(max_length=10, choices=[('credit', 'Credit'), ('debit', 'Debit')])
+    # Client-supplied key for the bulk ingest API; a retried batch never posts twice
+    idempotency_key = models.CharField(max_length=100, null=True, blank=True)
+
+    objects = TransactionQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # The wallet totals are updated from post_save, so keep both writes in one transaction
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def totals_delta(self, sign=1):
+        # (credits, debits) contribution of this transaction to its wallet's totals
+        amount = self._meta.get_field('amount').to_python(self.amount).quantize(Decimal('0.01')) * sign
+        if self.transaction_type == 'credit':
+            return amount, Decimal('0')
+        if self.transaction_type == 'debit':
+            return Decimal('0'), amount
+        return Decimal('0'), Decimal('0')
+
+    def __str__(self):
+        # Only follow wallet -> user when it is already loaded, never two queries per object
+        if Transaction.wallet.is_cached(self) and Wallet.user.is_cached(self.wallet):
+            owner = self.wallet.user.username
+        else:
+            owner = f"Wallet {self.wallet_id}"
+        return f"{owner} - {self.description} - {self.amount}"
+
+    # On PostgreSQL the table can be range-partitioned by month of `date` (api/partitioning.py),
+    # and old rows archived with their totals carried forward (api/archive.py)
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            # History pages and keyset cursors: WHERE wallet = ? ORDER BY date DESC, id DESC
+            models.Index(fields=['wallet', '-date', '-id'], name='api_txn_wallet_date_id'),
+            # Per-type SUM(amount) answered from the index alone, without touching the table
+            models.Index(fields=['wallet', 'transaction_type', 'amount'], name='api_txn_wallet_type_amount'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'idempotency_key'],
+                condition=Q(idempotency_key__isnull=False),
+                name='api_txn_wallet_idempotency_key',
+            ),
+        ]
+
+
+class DailySummaryManager(models.Manager):
+    def apply_transactions(self, wallet_id, transactions, sign=1):
+        # Fold transactions into per-day deltas, then one UPDATE (or INSERT) per touched day
+        deltas = {}
+        for transaction in transactions:
+            credit, debit = transaction.totals_delta(sign)
+            day = deltas.setdefault(transaction.date, [Decimal('0'), Decimal('0'), 0, 0])
+            day[0] += credit
+            day[1] += debit
+            day[2] += sign if transaction.transaction_type == 'credit' else 0
+            day[3] += sign if transaction.transaction_type == 'debit' else 0
+        for date, (credits, debits, credit_count, debit_count) in deltas.items():
+            self._apply_delta(wallet_id, date, credits, debits, credit_count, debit_count)
+
+    def _apply_delta(self, wallet_id, date, credits, debits, credit_count, debit_count):
+        updates = dict(
+            credits=F('credits') + credits,
+            debits=F('debits') + debits,
+            credit_count=F('credit_count') + credit_count,
+            debit_count=F('debit_count') + debit_count,
+        )
+        if self.filter(wallet_id=wallet_id, date=date).update(**updates):
+            if credit_count + debit_count < 0:
+                # Drop days whose last transaction was removed or moved away
+                self.filter(wallet_id=wallet_id, date=date, credit_count=0, debit_count=0).delete()
+            return
+        try:
+            with db_transaction.atomic():
+                self.create(
+                    wallet_id=wallet_id, date=date, credits=credits, debits=debits,
+                    credit_count=credit_count, debit_count=debit_count,
+                )
+        except IntegrityError:
+            # Another writer created the day first
+            self.filter(wallet_id=wallet_id, date=date).update(**updates)
+
+    def rebuild(self, wallet_ids=None):
+        # Recompute the table from transactions with one GROUP BY (wallet, date). Days up to
+        # a wallet's archive cut-off are kept as they are: their transactions are archived.
+        archived_through = WalletCarryForward.objects.filter(wallet_id=OuterRef('wallet_id')).values('archived_through')
+        hot = Q(date__gt=Coalesce(Subquery(archived_through), Value(datetime.date.min)))
+        transactions = Transaction.objects.filter(hot)
+        summaries = self.filter(hot)
+        if wallet_ids is not None:
+            transactions = transactions.filter(wallet_id__in=wallet_ids)
+            summaries = summaries.filter(wallet_id__in=wallet_ids)
+        rows = transactions.values('wallet_id', 'date').annotate(
+            credits=Sum('amount', filter=Q(transaction_type='credit'), default=0),
+            debits=Sum('amount', filter=Q(transaction_type='debit'), default=0),
+            credit_count=models.Count('id', filter=Q(transaction_type='credit')),
+            debit_count=models.Count('id', filter=Q(transaction_type='debit')),
+        ).order_by()
+        with db_transaction.atomic():
+            summaries.delete()
+            created = self.bulk_create((self.model(**row) for row in rows.iterator()), batch_size=2000)
+        return len(created)
+
+
+class DailySummary(models.Model):
+    # Per-wallet, per-day credit/debit totals maintained by api.signals, so period
+    # charts group a few hundred rows instead of the whole transaction history
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="daily_summaries")
+    date = models.DateField()
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_count = models.IntegerField(default=0)
+    debit_count = models.IntegerField(default=0)
+
+    objects = DailySummaryManager()
+
+    def __str__(self):
+        return f"{self.wallet_id} - {self.date}"
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'date'], name='api_dailysummary_wallet_date'),
+        ]
+
+
+class BalanceSnapshotManager(models.Manager):
+    def balance_on(self, wallet_id, date):
+        # Latest snapshot on or before `date`: one seek on the (wallet, date) unique index
+        return self._latest_balance(wallet_id, date__lte=date)
+
+    def _latest_balance(self, wallet_id, **date_lookup):
+        balance = (
+            self.filter(wallet_id=wallet_id, **date_lookup)
+            .order_by('-date')
+            .values_list('balance', flat=True)
+            .first()
+        )
+        return balance if balance is not None else Decimal('0')
+
+    def recompute_from(self, wallet_id, start_date):
+        # Rewrite the snapshots from start_date onwards using the per-day rollups, so a
+        # back-dated write only touches the days after it. Callers run inside the
+        # write's transaction, after Wallet.adjust_totals has locked the wallet row.
+        balance = self._latest_balance(wallet_id, date__lt=start_date)
+        snapshots = []
+        days = (
+            DailySummary.objects.filter(wallet_id=wallet_id, date__gte=start_date)
+            .order_by('date')
+            .values_list('date', 'credits', 'debits')
+        )
+        for date, credits, debits in days.iterator():
+            balance += debits - credits
+            snapshots.append(self.model(wallet_id=wallet_id, date=date, balance=balance))
+        self.filter(wallet_id=wallet_id, date__gte=start_date).delete()
+        self.bulk_create(snapshots, batch_size=2000)
+
+
+class BalanceSnapshot(models.Model):
+    # Closing balance (debits - credits, as Wallet.balance) of every day with activity
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="balance_snapshots")
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+
+    objects = BalanceSnapshotManager()
+
+    def __str__(self):
+        return f"{self.wallet_id} - {self.date}: {self.balance}"
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'date'], name='api_balancesnapshot_wallet_date'),
+        ]
+
+
+class WalletCarryForward(models.Model):
+    # Totals of the wallet's archived transactions (see api/archive.py), which
+    # calculate_totals and the rebuild commands add to what is left in api_transaction
+    wallet = models.OneToOneField(Wallet, on_delete=models.CASCADE, related_name="carry_forward")
+    # Every transaction dated on or before this day has been archived
+    archived_through = models.DateField()
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_count = models.PositiveIntegerField(default=0)
+    debit_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return f"{self.wallet_id} through {self.archived_through}"
+
 
+class TransactionArchive(models.Model):
+    # One wallet's archived transactions for one month, as compressed rows (see api/archive.py)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="transaction_archives")
+    month = models.DateField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    transaction_count = models.PositiveIntegerField()
+    credits = models.DecimalField(max_digits=14, decimal_places=2)
+    debits = models.DecimalField(max_digits=14, decimal_places=2)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.wallet.user.username} - {self.description} - {self.amount}"
-    
+        return f"{self.wallet_id} - {self.month:%Y-%m} ({self.transaction_count} transactions)"
+
+    class Meta:
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['wallet', 'month'], name='api_txnarchive_wallet_month'),
+        ]
+
+
+class ArchivedIdempotencyKey(models.Model):
+    # Idempotency keys of archived transactions, still checked by the bulk ingest API (and by the
+    # PostgreSQL partitioning trigger), so a retry of an archived request is not posted again
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="archived_idempotency_keys", db_index=False)
+    idempotency_key = models.CharField(max_length=100)
+
+    def __str__(self):
+        return f"{self.wallet_id} - {self.idempotency_key}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'idempotency_key'], name='api_archivedkey_wallet_key'),
+        ]
+
+
+class Job(models.Model):
+    # Background work (CSV imports, PDF statements) queued in the database and run by `manage.py run_jobs`
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    KIND_CHOICES = [('csv_import', 'CSV import'), ('pdf_statement', 'PDF statement')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="jobs")
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="jobs", null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    params = models.JSONField(default=dict, blank=True)
+    # Uploaded inputs and rendered results are JobFile chunks; `result` is the JSON summary
+    result = models.JSONField(null=True, blank=True)
+    result_filename = models.CharField(max_length=255, blank=True)
+    result_content_type = models.CharField(max_length=100, blank=True)
+    progress_current = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    cancel_requested = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    run_after = models.DateTimeField(default=now)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def report_progress(self, current, total=None):
+        # Doubles as the worker heartbeat; returns True once a cancel has been requested
+        updates = {'progress_current': current, 'heartbeat_at': now()}
+        if total is not None:
+            updates['progress_total'] = total
+        Job.objects.filter(pk=self.pk).update(**updates)
+        return Job.objects.filter(pk=self.pk, cancel_requested=True).exists()
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED, self.CANCELLED)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='api_job_status_run_after'),
+        ]
+
+
+class JobFile(models.Model):
+    # A job's uploaded input or rendered result, stored in the database one chunk per row
+    # (see api/job_files.py). Web and `run_jobs` processes may run on different hosts, so
+    # they share no filesystem, and neither side holds a whole file in memory.
+    INPUT = 'input'
+    RESULT = 'result'
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="files")
+    role = models.CharField(max_length=10, choices=[(INPUT, 'Input'), (RESULT, 'Result')])
+    index = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"Job {self.job_id} {self.role} chunk {self.index}"
+
     class Meta:
-        ordering = ['-date']
\ No newline at end of file
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'role', 'index'], name='api_jobfile_job_role_index'),
+        ]
@@ -0,0 +1,203 @@
+from datetime import date
+from django.core.management.base import CommandError
+
+# Monthly range partitioning of api_transaction by `date` on PostgreSQL, managed by
+# `manage.py partition_transactions`. Queries that filter or order by date only
+# scan the partitions they need, and once archival (api/archive.py) has emptied
+# the oldest months their partitions can be dropped instead of vacuumed.
+#
+# A partitioned table's unique indexes have to include the partition key, so the
+# primary key becomes (id, date), and the per-wallet idempotency keys are kept
+# unique in a side table maintained by a trigger. A violation still raises
+# IntegrityError, as the ingest API expects; keys of archived transactions are
+# rejected too. Rows dated outside every monthly partition land in the default
+# partition and are moved out when their month's partition is created.
+#
+# Django's migration state still describes the unpartitioned table, so once the
+# table is converted, `migrate` refuses migrations that change the Transaction
+# model (see check_transaction_migrations). Write those by hand for the
+# partitioned table, with SeparateDatabaseAndState.
+
+TABLE = 'api_transaction'
+DEFAULT_PARTITION = f'{TABLE}_default'
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+IDEMPOTENCY_TABLE = 'api_transaction_idempotency'
+ARCHIVED_KEYS_TABLE = 'api_archivedidempotencykey'
+
+INDEXES = [
+    f"CREATE INDEX api_txn_wallet_date_id ON {TABLE} (wallet_id, date DESC, id DESC)",
+    f"CREATE INDEX api_txn_wallet_type_amount ON {TABLE} (wallet_id, transaction_type, amount)",
+    f"CREATE INDEX api_txn_wallet_idempotency_key ON {TABLE} (wallet_id, idempotency_key) "
+    "WHERE idempotency_key IS NOT NULL",
+    f"CREATE INDEX api_txn_description_trgm ON {TABLE} USING gin (UPPER(description) gin_trgm_ops)",
+]
+
+IDEMPOTENCY_SQL = [
+    f"CREATE TABLE {IDEMPOTENCY_TABLE} ("
+    "wallet_id bigint NOT NULL, idempotency_key varchar(100) NOT NULL, PRIMARY KEY (wallet_id, idempotency_key))",
+    f"""
+    CREATE FUNCTION {IDEMPOTENCY_TABLE}_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.idempotency_key IS NOT NULL THEN
+            DELETE FROM {IDEMPOTENCY_TABLE} WHERE wallet_id = OLD.wallet_id AND idempotency_key = OLD.idempotency_key;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.idempotency_key IS NOT NULL THEN
+            IF EXISTS (
+                SELECT 1 FROM {ARCHIVED_KEYS_TABLE} WHERE wallet_id = NEW.wallet_id AND idempotency_key = NEW.idempotency_key
+            ) THEN
+                RAISE unique_violation USING MESSAGE = 'idempotency key belongs to an archived transaction';
+            END IF;
+            INSERT INTO {IDEMPOTENCY_TABLE} (wallet_id, idempotency_key) VALUES (NEW.wallet_id, NEW.idempotency_key);
+        END IF;
+        RETURN NULL;
+    END
+    $$""",
+    f"CREATE TRIGGER {IDEMPOTENCY_TABLE}_sync AFTER INSERT OR DELETE OR UPDATE OF wallet_id, idempotency_key "
+    f"ON {TABLE} FOR EACH ROW EXECUTE FUNCTION {IDEMPOTENCY_TABLE}_sync()",
+]
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection):
+    # (name, bounds, estimated rows), oldest month first and the default partition last
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), GREATEST(c.reltuples, 0)::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname = %s, c.relname",
+            [TABLE, DEFAULT_PARTITION],
+        )
+        return cursor.fetchall()
+
+
+def create_partition(cursor, month):
+    # Returns False when the month already has a partition
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+    start, end = month, add_months(month, 1)
+    # Built detached and filled from the default partition, which may already hold rows of this month
+    cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        [start, end],
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    # Deleting the moved rows from the default partition released their idempotency keys
+    cursor.execute(
+        f"INSERT INTO {IDEMPOTENCY_TABLE} (wallet_id, idempotency_key) "
+        f"SELECT wallet_id, idempotency_key FROM {name} WHERE idempotency_key IS NOT NULL ON CONFLICT DO NOTHING"
+    )
+    return True
+
+
+def create_partitions(connection, first_month, last_month):
+    created = []
+    month = first_month
+    with connection.cursor() as cursor:
+        while month <= last_month:
+            if create_partition(cursor, month):
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+    return created
+
+
+def convert_to_partitioned(connection, last_month):
+    """
+    Rebuild api_transaction as a partitioned table holding the same rows, with one
+    partition per month from the oldest transaction through `last_month`.
+
+    Runs in the caller's transaction and holds an exclusive lock on the table
+    while the rows are copied, so schedule it in a maintenance window.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT MIN(date), MAX(id) FROM {TABLE}")
+        oldest, max_id = cursor.fetchone()
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}")
+        # Frees the primary key's name, so the new table's matches what Django created
+        cursor.execute(f"ALTER TABLE {UNPARTITIONED_TABLE} RENAME CONSTRAINT {TABLE}_pkey TO {UNPARTITIONED_TABLE}_pkey")
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+            "PARTITION BY RANGE (date)"
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, date)")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT api_transaction_wallet_id_fk FOREIGN KEY (wallet_id) "
+            "REFERENCES api_wallet (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+        for sql in IDEMPOTENCY_SQL:
+            cursor.execute(sql)
+    create_partitions(connection, month_start(oldest or last_month), last_month)
+
+    with connection.cursor() as cursor:
+        # The trigger fills the idempotency table as the rows are copied
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE}")
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s, true)", [TABLE, max_id or 1])
+        cursor.execute(f"DROP TABLE {UNPARTITIONED_TABLE}")
+        # Runs the copied rows' deferred foreign key checks now; indexes can't be built while they are pending
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        # Built after the copy, once per partition, under the names Django's migrations use
+        for sql in INDEXES:
+            cursor.execute(sql)
+        cursor.execute(f"ANALYZE {TABLE}")
+
+
+def drop_empty_partitions(connection, before_month):
+    # Monthly partitions that ended before `before_month` and hold no rows, e.g. after archival
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, _, _ in list_partitions(connection):
+            if name == DEFAULT_PARTITION or name >= partition_name(before_month):
+                continue
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {name})")
+            if not cursor.fetchone()[0]:
+                cursor.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+    return dropped
+
+
+def check_transaction_migrations(plan, using, **kwargs):
+    # pre_migrate receiver: the operations Django would generate for the model assume the
+    # unpartitioned table (single-column primary key, unique idempotency constraint)
+    from django.db import connections
+
+    if not plan or not is_partitioned(connections[using]):
+        return
+    blocked = [
+        f"{migration.app_label}.{migration.name}"
+        for migration, backwards in plan
+        if migration.app_label == 'api' and any(
+            getattr(operation, 'model_name', getattr(operation, 'name', '')).lower() == 'transaction'
+            for operation in migration.operations
+        )
+    ]
+    if blocked:
+        raise CommandError(
+            f"{TABLE} is partitioned, but these migrations change the Transaction model as if it "
+            f"were not: {', '.join(blocked)}. Rewrite them for the partitioned table "
+            "(api/partitioning.py) using SeparateDatabaseAndState."
+        )
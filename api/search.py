@@ -0,0 +1,68 @@
+from django.db import connections
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+# Transaction description search, backed by the indexes from migration 0013:
+# - PostgreSQL: `icontains` (UPPER(description) LIKE ...) uses the GIN trigram
+#   index, and matches are ranked by trigram word similarity to the query.
+# - SQLite: the FTS5 trigram table, ranked by bm25.
+# Terms shorter than a trigram cannot use either index and fall back to a plain
+# `icontains` scan.
+
+FTS_TABLE = 'api_transaction_fts'
+MIN_INDEXED_LENGTH = 3
+
+_fts_available = {}
+
+
+def _backend(queryset, term):
+    if len(term) < MIN_INDEXED_LENGTH:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        return 'trigram'
+    if connection.vendor == 'sqlite' and _has_fts_table(connection):
+        return 'fts'
+    return None
+
+
+def _has_fts_table(connection):
+    # Checked once per database; the table is absent when SQLite lacks FTS5 or 0013 isn't applied
+    if connection.alias not in _fts_available:
+        with connection.cursor() as cursor:
+            _fts_available[connection.alias] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_available[connection.alias]
+
+
+def _fts_phrase(term):
+    # Quoted as one FTS5 string, so the term matches as a substring and never as query syntax
+    return '"' + term.replace('"', '""') + '"'
+
+
+def filter_descriptions(queryset, term):
+    # Index-backed `description contains term`, for callers that don't need ranking
+    if _backend(queryset, term) == 'fts':
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts_phrase(term)]))
+    return queryset.filter(description__icontains=term)
+
+
+def search_transactions(queryset, term):
+    """
+    Transactions in `queryset` whose description contains `term`, annotated with a
+    `rank` (higher is better) and ordered by rank, then newest first.
+    """
+    backend = _backend(queryset, term)
+    matches = filter_descriptions(queryset, term)
+    if backend == 'trigram':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        rank = TrigramWordSimilarity(term, 'description')
+    elif backend == 'fts':
+        table = queryset.model._meta.db_table
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [_fts_phrase(term)], output_field=FloatField(),
+        )
+    else:
+        rank = Value(1.0, output_field=FloatField())
+    return matches.annotate(rank=rank).order_by(F('rank').desc(), '-date', '-id')
@@ -1,13 +1,114 @@
+from decimal import Decimal
 from rest_framework import serializers
-from .models import Wallet, Transaction
+from django.urls import reverse
+from .models import Wallet, Transaction, Job, BalanceSnapshot
 
 class WalletSerializer(serializers.ModelSerializer):
+    balance = serializers.DecimalField(max_digits=14, decimal_places=2, coerce_to_string=False, read_only=True)
+
     class Meta:
         model = Wallet
         fields = ['user', 'balance']
 
 class TransactionSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Optional projection, e.g. ?fields=date,amount
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Transaction
         fields = ['date', 'description', 'amount', 'transaction_type']
-        read_only_fields = ['date', 'description', 'amount','transaction_type']
\ No newline at end of file
+        read_only_fields = ['date', 'description', 'amount','transaction_type']
+
+class DateRangeSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start_date') and attrs.get('end_date') and attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError("start_date must be on or before end_date")
+        return attrs
+
+class PeriodSummaryQuerySerializer(DateRangeSerializer):
+    bucket = serializers.ChoiceField(choices=['day', 'week', 'month'], default='month')
+
+class InsightsQuerySerializer(DateRangeSerializer):
+    horizon = serializers.IntegerField(min_value=1, max_value=365, default=30)
+    top = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+class PeriodSummarySerializer(serializers.Serializer):
+    period = serializers.DateField()
+    credits = serializers.DecimalField(max_digits=16, decimal_places=2)
+    debits = serializers.DecimalField(max_digits=16, decimal_places=2)
+    credit_count = serializers.IntegerField()
+    debit_count = serializers.IntegerField()
+
+class BalanceHistoryQuerySerializer(DateRangeSerializer):
+    date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs.get('date') and (attrs.get('start_date') or attrs.get('end_date')):
+            raise serializers.ValidationError("Use either date or start_date/end_date, not both")
+        return attrs
+
+class BalanceSnapshotSerializer(serializers.ModelSerializer):
+    # Numeric like WalletSerializer.balance
+    balance = serializers.DecimalField(max_digits=14, decimal_places=2, coerce_to_string=False, read_only=True)
+
+    class Meta:
+        model = BalanceSnapshot
+        fields = ['date', 'balance']
+
+class TransactionIngestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Transaction
+        fields = ['date', 'description', 'amount', 'transaction_type', 'idempotency_key']
+        # Negative amounts would flip the ledger sign behind transaction_type
+        extra_kwargs = {'date': {'required': True}, 'amount': {'min_value': Decimal('0')}}
+        # Uniqueness is enforced per batch in api.ingest, not with a query per item
+        validators = []
+
+class TransactionFilterSerializer(DateRangeSerializer):
+    transaction_type = serializers.ChoiceField(choices=['credit', 'debit'], required=False)
+    fields = serializers.CharField(required=False)
+
+    def validate_fields(self, value):
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(fields) - set(TransactionSerializer.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return fields
+
+
+class TransactionSearchQuerySerializer(TransactionFilterSerializer):
+    q = serializers.CharField(max_length=100)
+
+
+class TransactionSearchResultSerializer(TransactionSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(TransactionSerializer.Meta):
+        fields = TransactionSerializer.Meta.fields + ['rank']
+
+
+class JobSerializer(serializers.ModelSerializer):
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'progress_current', 'progress_total', 'attempts', 'max_attempts',
+            'cancel_requested', 'error', 'result', 'result_url', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_result_url(self, job):
+        if job.status != Job.SUCCEEDED or not job.result_filename:
+            return None
+        url = reverse('job-result', kwargs={'pk': job.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,140 @@
+from datetime import datetime
+from django.db import transaction as db_transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+from django.utils.timezone import localdate
+from .models import Wallet, Transaction, DailySummary, BalanceSnapshot
+from .statement_cache import invalidate_wallet_statements
+from .db_routers import pin_to_primary
+from .wallet_cache import invalidate_wallet_summary
+
+# Sent by bulk writers (CSV import) after bulk_create, which skips post_save.
+# Receivers get wallet_id and the list of created transactions.
+transactions_bulk_created = Signal()
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    # Updates have to back out the old amount/type/wallet before applying the new one
+    instance._previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous = (
+        Transaction.objects.select_for_update()
+        .only('wallet_id', 'date', 'amount', 'transaction_type')
+        .filter(pk=instance.pk)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def update_wallet_totals_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        # Fixtures bypass the running totals; run rebuild_wallet_balances afterwards
+        return
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        Wallet.adjust_totals(previous.wallet_id, *previous.totals_delta(sign=-1))
+    Wallet.adjust_totals(instance.wallet_id, *instance.totals_delta())
+
+
+def _deleted_directly(origin):
+    # False when the transaction goes because its wallet/user is being deleted;
+    # there is then nothing left to keep in step, and recreating rows would break the FK.
+    return isinstance(origin, Transaction) or getattr(origin, 'model', None) is Transaction
+
+
+@receiver(post_delete, sender=Transaction)
+def update_wallet_totals_on_delete(sender, instance, origin=None, **kwargs):
+    if not _deleted_directly(origin):
+        return
+    Wallet.adjust_totals(instance.wallet_id, *instance.totals_delta(sign=-1))
+
+
+@receiver(transactions_bulk_created)
+def update_wallet_totals_on_bulk_create(sender, wallet_id, transactions, **kwargs):
+    # One UPDATE per batch instead of one per row
+    credits, debits = 0, 0
+    for transaction in transactions:
+        credit, debit = transaction.totals_delta()
+        credits += credit
+        debits += debit
+    Wallet.adjust_totals(wallet_id, credits, debits)
+
+
+@receiver(post_save, sender=Transaction)
+def update_daily_summary_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        DailySummary.objects.apply_transactions(previous.wallet_id, [previous], sign=-1)
+    DailySummary.objects.apply_transactions(instance.wallet_id, [instance])
+
+
+@receiver(post_delete, sender=Transaction)
+def update_daily_summary_on_delete(sender, instance, origin=None, **kwargs):
+    if not _deleted_directly(origin):
+        return
+    DailySummary.objects.apply_transactions(instance.wallet_id, [instance], sign=-1)
+
+
+@receiver(transactions_bulk_created)
+def update_daily_summary_on_bulk_create(sender, wallet_id, transactions, **kwargs):
+    DailySummary.objects.apply_transactions(wallet_id, transactions)
+
+
+# Registered after the DailySummary receivers, which the snapshots are recomputed from
+@receiver(post_save, sender=Transaction)
+def update_balance_snapshots_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    if previous is not None and previous.wallet_id != instance.wallet_id:
+        BalanceSnapshot.objects.recompute_from(previous.wallet_id, previous.date)
+        previous = None
+    start = _as_date(instance.date) if previous is None else min(_as_date(instance.date), _as_date(previous.date))
+    BalanceSnapshot.objects.recompute_from(instance.wallet_id, start)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_balance_snapshots_on_delete(sender, instance, origin=None, **kwargs):
+    if not _deleted_directly(origin):
+        return
+    BalanceSnapshot.objects.recompute_from(instance.wallet_id, _as_date(instance.date))
+
+
+@receiver(transactions_bulk_created)
+def update_balance_snapshots_on_bulk_create(sender, wallet_id, transactions, **kwargs):
+    BalanceSnapshot.objects.recompute_from(wallet_id, min(_as_date(t.date) for t in transactions))
+
+
+def _as_date(value):
+    # Transaction.date defaults to timezone.now(), so unsaved instances may still hold a datetime
+    return localdate(value) if isinstance(value, datetime) else value
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_caches_on_write(sender, instance, **kwargs):
+    wallet_ids = {instance.wallet_id}
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        wallet_ids.add(previous.wallet_id)
+    for wallet_id in wallet_ids:
+        db_transaction.on_commit(lambda wallet_id=wallet_id: invalidate_wallet_caches(wallet_id))
+
+
+@receiver(transactions_bulk_created)
+def invalidate_caches_on_bulk_create(sender, wallet_id, **kwargs):
+    db_transaction.on_commit(lambda: invalidate_wallet_caches(wallet_id))
+
+
+def invalidate_wallet_caches(wallet_id):
+    # Drop everything derived from the wallet's transactions: cached statements and the summary payload
+    invalidate_wallet_statements(wallet_id)
+    user_id = Wallet.objects.filter(pk=wallet_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_wallet_summary(user_id)
+        # Also covers writes the owner didn't make themselves (admin CSV imports, jobs)
+        pin_to_primary(user_id)
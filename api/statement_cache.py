@@ -0,0 +1,58 @@
+import glob
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+
+# Rendered statements and exports are cached as files named
+# <wallet id>-<wallet version>-<digest>.<kind>. The digest covers the wallet,
+# its version and the request parameters, so any transaction write (which bumps
+# Wallet.version) makes older files unreachable; api.signals also deletes them.
+
+
+def statement_digest(wallet, kind, params):
+    parts = [str(wallet.pk), str(wallet.version), kind]
+    parts += [f"{name}={value}" for name, value in sorted(params.items()) if value is not None]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def open_cached_statement(wallet, kind, params, render):
+    """
+    Return an open binary file with the cached `kind` file for `wallet`/`params`,
+    calling render(file) to produce it on a miss.
+    """
+    directory = settings.STATEMENT_CACHE_DIR
+    digest = statement_digest(wallet, kind, params)
+    path = os.path.join(directory, f"{wallet.pk}-{wallet.version}-{digest[:32]}.{kind}")
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            render(output)
+        # Atomic rename so concurrent readers never see a half-written file
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    cached = open(path, 'rb')
+    _remove_files(wallet.pk, keep_version=wallet.version)
+    return cached
+
+
+def invalidate_wallet_statements(wallet_id):
+    _remove_files(wallet_id)
+
+
+def _remove_files(wallet_id, keep_version=None):
+    for path in glob.glob(os.path.join(settings.STATEMENT_CACHE_DIR, f"{wallet_id}-*")):
+        if keep_version is not None and os.path.basename(path).startswith(f"{wallet_id}-{keep_version}-"):
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
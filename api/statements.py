@@ -0,0 +1,88 @@
+from itertools import islice
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Table, TableStyle, Paragraph
+from reportlab.lib.styles import getSampleStyleSheet
+from .models import Transaction
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 72
+COLUMN_WIDTHS = [100, 200, 100, 100]
+HEADER = ["Date", "Description", "Amount (£)", "Type"]
+# Every row is a single line of 10pt text with the paddings below (~21pt), so a
+# fixed number of rows fits a page; the first page also carries the title block.
+ROWS_PER_PAGE = 28
+ROWS_ON_FIRST_PAGE = 23
+
+TABLE_STYLE = TableStyle([
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),  # Header color
+    ('BACKGROUND', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+])
+
+
+def write_transaction_pdf(wallet, output, start_date=None, end_date=None, progress=None):
+    """
+    Render the wallet's statement into the file-like `output`, one page at a time.
+
+    Rows are streamed from the database with .iterator() and laid out as one small
+    table per page, so only a single page of rows is ever held in memory.
+    `progress` is called with the number of rows drawn after every page.
+    """
+    user = wallet.user
+    rows = (
+        Transaction.objects.filter(wallet=wallet)
+        .filtered(start_date=start_date, end_date=end_date)
+        .order_by('-date', '-id')
+        .values_list('date', 'description', 'amount', 'transaction_type')
+        .iterator(chunk_size=2000)
+    )
+
+    canvas = Canvas(output, pagesize=letter, pageCompression=1)
+    canvas.setTitle(f"Transaction History for {user.username}")
+    styles = getSampleStyleSheet()
+
+    # Title block: title, balance and the statement period when one was requested
+    top = PAGE_HEIGHT - MARGIN
+    top = _draw(canvas, Paragraph(f"<b>Transaction History for {user.username}</b>", styles["Title"]), top) - 12
+    top = _draw(canvas, Paragraph(f"<b>Current Balance: £{wallet.balance:.2f}</b>", styles["Normal"]), top)
+    if start_date or end_date:
+        period = f"{start_date or 'start'} to {end_date or 'today'}"
+        top = _draw(canvas, Paragraph(f"Period: {period}", styles["Normal"]), top - 6)
+    top -= 20
+
+    page_size, first_page, drawn = ROWS_ON_FIRST_PAGE, True, 0
+    while True:
+        page = [
+            [str(date), description, f"£{amount:.2f}", transaction_type]
+            for date, description, amount, transaction_type in islice(rows, page_size)
+        ]
+        # Always draw the first page's table, even for an empty statement
+        if not page and not first_page:
+            break
+        table = Table([HEADER] + page, colWidths=COLUMN_WIDTHS)
+        table.setStyle(TABLE_STYLE)
+        _draw(canvas, table, top)
+        canvas.showPage()
+        drawn += len(page)
+        if progress:
+            progress(drawn)
+        if len(page) < page_size:
+            break
+        page_size, first_page = ROWS_PER_PAGE, False
+        top = PAGE_HEIGHT - MARGIN
+
+    canvas.save()
+
+
+def _draw(canvas, flowable, top):
+    # Draw `flowable` horizontally centred with its top edge at `top`; returns its bottom edge
+    width, height = flowable.wrapOn(canvas, PAGE_WIDTH - 2 * MARGIN, PAGE_HEIGHT)
+    flowable.drawOn(canvas, (PAGE_WIDTH - width) / 2, top - height)
+    return top - height
@@ -1,3 +1,1041 @@
-from django.test import TestCase
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.db import connections
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .archive import archive_wallet, restore_wallet
+from .authentication import tokens_for_user
+from .checks import check_replica_pin_cache
+from .csv_import import CSVImportError, import_transactions_csv
+from .db_routers import ReplicaRouter, RequestRouting, current_routing, is_pinned, pin_to_primary
+from .job_files import open_job_file
+from .jobs import cancel_job, claim_jobs, enqueue_job, execute_job, requeue_stale_jobs
+from .metrics import assert_max_queries
+from .middleware import ReadReplicaMiddleware
+from .wallet_cache import cache_stats, reset_cache_stats
+from .models import (
+    ArchivedIdempotencyKey, BalanceSnapshot, DailySummary, Job, JobFile, Transaction, TransactionArchive, Wallet,
+    WalletCarryForward,
+)
 
-# Create your tests here.
+TODAY = date(2026, 6, 15)
+
+
+def make_wallet(username):
+    user = User.objects.create_user(username=username, password='password')
+    return Wallet.objects.create(user=user)
+
+
+def add_transaction(wallet, amount, transaction_type='debit', day=TODAY, **extra):
+    return Transaction.objects.create(
+        wallet=wallet, date=day, description=extra.pop('description', 'Groceries'),
+        amount=Decimal(amount), transaction_type=transaction_type, **extra,
+    )
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wallet = make_wallet('alice')
+        self.client = APIClient()
+        token = tokens_for_user(self.wallet.user, self.wallet.pk).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        statement_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, statement_dir, ignore_errors=True)
+        overrides = self.settings(STATEMENT_CACHE_DIR=statement_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def seed(self, count):
+        for i in range(count):
+            add_transaction(
+                self.wallet, f"{i + 1}.00", 'credit' if i % 3 == 0 else 'debit',
+                day=TODAY - timedelta(days=i // 2), description=f"Coffee shop {i}",
+            )
+
+
+class LedgerSignalTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet('alice')
+        self.other = make_wallet('bob')
+
+    def assertTotals(self, wallet, credits, debits):
+        wallet.refresh_from_db()
+        self.assertEqual((wallet.total_credits, wallet.total_debits), (Decimal(credits), Decimal(debits)))
+        self.assertEqual(wallet.balance, Decimal(debits) - Decimal(credits))
+        self.assertEqual(wallet.calculate_balance(), wallet.balance)
+
+    def summaries(self, wallet):
+        return list(DailySummary.objects.filter(wallet=wallet).order_by('date').values_list(
+            'date', 'credits', 'debits', 'credit_count', 'debit_count',
+        ))
+
+    def snapshots(self, wallet):
+        return list(BalanceSnapshot.objects.filter(wallet=wallet).order_by('date').values_list('date', 'balance'))
+
+    def test_create(self):
+        add_transaction(self.wallet, '100.00', 'debit', day=TODAY - timedelta(days=1))
+        add_transaction(self.wallet, '30.00', 'credit')
+        add_transaction(self.wallet, '5.00', 'debit')
+
+        self.assertTotals(self.wallet, '30.00', '105.00')
+        self.assertEqual(self.summaries(self.wallet), [
+            (TODAY - timedelta(days=1), Decimal('0'), Decimal('100.00'), 0, 1),
+            (TODAY, Decimal('30.00'), Decimal('5.00'), 1, 1),
+        ])
+        self.assertEqual(self.snapshots(self.wallet), [
+            (TODAY - timedelta(days=1), Decimal('100.00')),
+            (TODAY, Decimal('75.00')),
+        ])
+
+    def test_update_amount_type_and_date(self):
+        transaction = add_transaction(self.wallet, '100.00', 'debit')
+        add_transaction(self.wallet, '10.00', 'debit', day=TODAY - timedelta(days=2))
+
+        transaction.amount = Decimal('40.00')
+        transaction.transaction_type = 'credit'
+        transaction.date = TODAY - timedelta(days=5)
+        transaction.save()
+
+        self.assertTotals(self.wallet, '40.00', '10.00')
+        self.assertEqual(self.summaries(self.wallet), [
+            (TODAY - timedelta(days=5), Decimal('40.00'), Decimal('0'), 1, 0),
+            (TODAY - timedelta(days=2), Decimal('0'), Decimal('10.00'), 0, 1),
+        ])
+        self.assertEqual(self.snapshots(self.wallet), [
+            (TODAY - timedelta(days=5), Decimal('-40.00')),
+            (TODAY - timedelta(days=2), Decimal('-30.00')),
+        ])
+
+    def test_move_to_another_wallet(self):
+        transaction = add_transaction(self.wallet, '25.00', 'debit')
+        add_transaction(self.other, '5.00', 'credit', day=TODAY - timedelta(days=1))
+
+        transaction.wallet = self.other
+        transaction.save()
+
+        self.assertTotals(self.wallet, '0', '0')
+        self.assertEqual(self.summaries(self.wallet), [])
+        self.assertEqual(self.snapshots(self.wallet), [])
+        self.assertTotals(self.other, '5.00', '25.00')
+        self.assertEqual(self.snapshots(self.other), [
+            (TODAY - timedelta(days=1), Decimal('-5.00')),
+            (TODAY, Decimal('20.00')),
+        ])
+
+    def test_delete(self):
+        first = add_transaction(self.wallet, '60.00', 'debit', day=TODAY - timedelta(days=1))
+        add_transaction(self.wallet, '15.00', 'credit')
+
+        first.delete()
+
+        self.assertTotals(self.wallet, '15.00', '0')
+        self.assertEqual(self.summaries(self.wallet), [(TODAY, Decimal('15.00'), Decimal('0'), 1, 0)])
+        self.assertEqual(self.snapshots(self.wallet), [(TODAY, Decimal('-15.00'))])
+
+    def test_every_write_bumps_the_version(self):
+        versions = [self.wallet.version]
+        transaction = add_transaction(self.wallet, '1.00')
+        transaction.description = 'Renamed'
+        for write in (lambda: None, transaction.save, transaction.delete):
+            write()
+            self.wallet.refresh_from_db()
+            self.assertGreater(self.wallet.version, versions[-1])
+            versions.append(self.wallet.version)
+
+    def test_deleting_the_user_removes_the_ledger(self):
+        add_transaction(self.wallet, '1.00')
+        self.wallet.user.delete()
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(DailySummary.objects.exists())
+
+
+class BulkIngestTests(APITestCase):
+    url = '/api/transactions/bulk/'
+
+    def items(self, count, keyed=True):
+        return [
+            {
+                'date': str(TODAY - timedelta(days=i)), 'description': f"Item {i}", 'amount': '10.00',
+                'transaction_type': 'debit', **({'idempotency_key': f"key-{i}"} if keyed else {}),
+            }
+            for i in range(count)
+        ]
+
+    def test_retry_does_not_post_twice(self):
+        response = self.client.post(self.url, self.items(5), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'created': 5, 'duplicates': 0})
+
+        response = self.client.post(self.url, self.items(6), format='json')
+        self.assertEqual(response.json(), {'created': 1, 'duplicates': 5})
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('60.00'))
+        self.assertEqual(Transaction.objects.filter(wallet=self.wallet).count(), 6)
+        self.assertEqual(BalanceSnapshot.objects.balance_on(self.wallet.pk, TODAY), Decimal('60.00'))
+
+    def test_retry_with_idempotency_key_header(self):
+        for _ in range(2):
+            response = self.client.post(self.url, self.items(3, keyed=False), format='json', HTTP_IDEMPOTENCY_KEY='batch-1')
+        self.assertEqual(response.json(), {'created': 0, 'duplicates': 3})
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('idempotency_key', flat=True)),
+            ['batch-1:0', 'batch-1:1', 'batch-1:2'],
+        )
+
+    def test_repeated_key_within_a_batch(self):
+        items = self.items(2)
+        items[1]['idempotency_key'] = items[0]['idempotency_key']
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.json(), {'created': 1, 'duplicates': 1})
+
+    def test_invalid_item_rolls_back_the_batch(self):
+        items = self.items(3)
+        items[2]['amount'] = 'abc'
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('2', response.json()['errors'])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_negative_amount_is_rejected(self):
+        items = self.items(1)
+        items[0]['amount'] = '-10.00'
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.json()['errors']['0'])
+
+    def test_retry_of_archived_transactions(self):
+        self.client.post(self.url, self.items(5), format='json')
+        archive_wallet(self.wallet.pk, TODAY - timedelta(days=2))
+        self.assertEqual(ArchivedIdempotencyKey.objects.filter(wallet=self.wallet).count(), 2)
+
+        response = self.client.post(self.url, self.items(5), format='json')
+        self.assertEqual(response.json(), {'created': 0, 'duplicates': 5})
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('50.00'))
+
+
+class CursorPaginationTests(APITestCase):
+    def test_pages_cover_history_in_order(self):
+        # Pairs of transactions share a date, so pages also break inside a day
+        self.seed(7)
+        expected = list(Transaction.objects.order_by('-date', '-id').values_list('description', flat=True))
+
+        seen = []
+        url = '/api/transactions/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), 3)
+            seen.extend(row['description'] for row in page['results'])
+            url = page['next']
+        self.assertEqual(seen, expected)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        self.seed(6)
+        first = self.client.get('/api/transactions/?page_size=2').json()
+        add_transaction(self.wallet, '1.00', day=TODAY + timedelta(days=1))
+        second = self.client.get(first['next']).json()
+        expected = list(Transaction.objects.order_by('-date', '-id').values_list('description', flat=True))[3:5]
+        self.assertEqual([row['description'] for row in second['results']], expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/transactions/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class StatementCacheTests(APITestCase):
+    url = '/api/transactions/pdf/'
+
+    def test_etag_revalidation(self):
+        self.seed(3)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # A new transaction bumps the wallet version, so the statement is rendered again
+        add_transaction(self.wallet, '2.00')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        response.close()
+
+    def test_etag_depends_on_the_period(self):
+        self.seed(3)
+        full = self.client.get(self.url)
+        period = self.client.get(self.url, {'start_date': str(TODAY), 'end_date': str(TODAY)})
+        self.assertNotEqual(full['ETag'], period['ETag'])
+        full.close()
+        period.close()
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet('alice')
+        self.old = [
+            add_transaction(self.wallet, '10.00', 'debit', day=date(2024, 1, 5), idempotency_key='jan'),
+            add_transaction(self.wallet, '4.00', 'credit', day=date(2024, 1, 20)),
+            add_transaction(self.wallet, '7.00', 'debit', day=date(2024, 2, 3), idempotency_key='feb'),
+        ]
+        self.recent = add_transaction(self.wallet, '1.00', 'credit', day=TODAY)
+        self.wallet.refresh_from_db()
+
+    def test_round_trip(self):
+        balance, snapshots = self.wallet.balance, list(BalanceSnapshot.objects.values_list('date', 'balance'))
+        rows = sorted(Transaction.objects.values_list('id', 'date', 'description', 'amount', 'transaction_type', 'idempotency_key'))
+
+        result = archive_wallet(self.wallet.pk, date(2025, 1, 1))
+        self.assertEqual((result.transactions, result.archives), (3, 2))
+        self.assertEqual(list(Transaction.objects.values_list('id', flat=True)), [self.recent.pk])
+        carry_forward = WalletCarryForward.objects.get(wallet=self.wallet)
+        self.assertEqual((carry_forward.credits, carry_forward.debits), (Decimal('4.00'), Decimal('17.00')))
+        self.assertEqual(carry_forward.archived_through, date(2024, 12, 31))
+
+        # Balances are unchanged and still verify against the ledger plus the carry-forward
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, balance)
+        self.assertEqual(self.wallet.calculate_balance(), balance)
+        self.assertEqual(list(BalanceSnapshot.objects.values_list('date', 'balance')), snapshots)
+        call_command('rebuild_wallet_balances', '--check', stdout=StringIO())
+
+        restored = restore_wallet(self.wallet.pk)
+        self.assertEqual(restored, 3)
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('id', 'date', 'description', 'amount', 'transaction_type', 'idempotency_key')),
+            rows,
+        )
+        self.assertFalse(TransactionArchive.objects.exists())
+        self.assertFalse(WalletCarryForward.objects.exists())
+        self.assertFalse(ArchivedIdempotencyKey.objects.exists())
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, balance)
+        self.assertEqual(self.wallet.calculate_balance(), balance)
+
+    def test_archiving_bumps_the_version(self):
+        version = self.wallet.version
+        archive_wallet(self.wallet.pk, date(2025, 1, 1))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.version, version + 1)
+
+    def test_nothing_to_archive(self):
+        result = archive_wallet(self.wallet.pk, date(2023, 1, 1))
+        self.assertEqual(result.transactions, 0)
+        self.assertFalse(WalletCarryForward.objects.exists())
+
+
+class QueryBudgetTests(APITestCase):
+    # Budgets are independent of the number of rows, so an N+1 regression fails here
+
+    def setUp(self):
+        super().setUp()
+        self.seed(30)
+
+    def test_wallet(self):
+        # Version check and build
+        with assert_max_queries(2):
+            response = self.client.get('/api/wallet/')
+        self.assertEqual(Decimal(response.json()['balance']), self.wallet.calculate_balance())
+        # Served from the cache after a version check
+        with assert_max_queries(1):
+            self.client.get('/api/wallet/')
+
+    def test_history(self):
+        with assert_max_queries(1):
+            response = self.client.get('/api/transactions/?page_size=20')
+        self.assertEqual(len(response.json()['results']), 20)
+        with assert_max_queries(1):
+            self.client.get(response.json()['next'])
+
+    def test_search(self):
+        with assert_max_queries(1):
+            response = self.client.get('/api/transactions/search/', {'q': 'coffee'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_pdf(self):
+        with assert_max_queries(2):
+            response = self.client.get('/api/transactions/pdf/')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        # A cached statement costs the wallet lookup only
+        with assert_max_queries(1):
+            response = self.client.get('/api/transactions/pdf/')
+        response.close()
+
+    def test_admin_changelists(self):
+        admin = User.objects.create_superuser('admin', password='password')
+        for name in ('bob', 'carol', 'dave'):
+            add_transaction(make_wallet(name), '3.00')
+        self.client.force_login(admin)
+
+        # Session, user and the page itself; the rows come with their wallet and user in one query
+        budgets = {'/admin/api/transaction/': 4, '/admin/api/wallet/': 5, '/admin/api/transaction/?q=coffee': 7}
+        for url, budget in budgets.items():
+            with self.subTest(url=url), assert_max_queries(budget):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+
+class CSVImportTests(TestCase):
+    header = "date,description,amount,transaction_type\n"
+
+    def setUp(self):
+        self.wallet = make_wallet('alice')
+
+    def run_import(self, body, **kwargs):
+        return import_transactions_csv(self.wallet, BytesIO((self.header + body).encode()), **kwargs)
+
+    def test_valid_rows_are_imported(self):
+        result = self.run_import("01-06-2026,Salary,100.00,Credit\n02/06/2026,Rent,40.5,debit\n")
+        self.assertEqual((result.created, result.skipped, result.errors), (2, 0, []))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('-59.50'))
+        self.assertEqual(BalanceSnapshot.objects.balance_on(self.wallet.pk, date(2026, 6, 2)), Decimal('-59.50'))
+
+    def test_invalid_rows_are_skipped_and_reported(self):
+        result = self.run_import(
+            "01-06-2026,Salary,100.00,credit\n"
+            "2026-06-01,Bad date,1.00,debit\n"
+            "01-06-2026,Bad amount,abc,debit\n"
+            "01-06-2026,Refund,-5.00,debit\n"
+            "01-06-2026,Too much,100000000,debit\n"
+            "01-06-2026,Bad type,1.00,transfer\n"
+            "01-06-2026, ,1.00,debit\n",
+            chunk_size=3,
+        )
+        self.assertEqual((result.created, result.skipped), (1, 6))
+        self.assertEqual([row for row, _ in result.errors], [2, 3, 4, 5, 6, 7])
+        self.assertIn('negative', result.errors[2][1])
+        self.assertEqual(result.as_dict()['errors'][0], {'row': 2, 'error': result.errors[0][1]})
+
+    def test_rows_are_counted_past_blank_lines_and_line_breaks(self):
+        result = self.run_import(
+            '01-06-2026,"Two\nlines",1.00,debit\n'
+            "\n"
+            "01-06-2026,Bad,1.00,transfer\n"
+        )
+        self.assertEqual(result.errors, [(2, "transaction_type must be 'credit' or 'debit'")])
+
+    def test_error_report_is_capped(self):
+        result = self.run_import("01-06-2026,Bad,abc,debit\n" * 5, max_errors=2)
+        self.assertEqual((result.skipped, len(result.errors)), (5, 2))
+
+    def test_missing_columns(self):
+        with self.assertRaises(CSVImportError):
+            import_transactions_csv(self.wallet, BytesIO(b"date,amount\n01-06-2026,1.00\n"))
+
+    def test_unreadable_file_rolls_back_earlier_chunks(self):
+        body = (self.header + "01-06-2026,Salary,1.00,credit\n" * 4).encode() + b"01-06-2026,\xff\xfe,1.00,debit\n"
+        with self.assertRaises(CSVImportError):
+            import_transactions_csv(self.wallet, BytesIO(body), chunk_size=2)
+        self.assertFalse(Transaction.objects.exists())
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('0'))
+
+
+class JobTests(APITestCase):
+    csv = b"date,description,amount,transaction_type\n01-06-2026,Salary,100.00,credit\n02-06-2026,Rent,40.00,debit\n"
+
+    def enqueue_import(self, body=None):
+        upload = SimpleUploadedFile('bank.csv', body or self.csv, content_type='text/csv')
+        return enqueue_job('csv_import', self.wallet.user, wallet=self.wallet, input_file=upload)
+
+    def run_claimed(self):
+        for job_id in claim_jobs(10, 'test'):
+            execute_job(job_id)
+
+    def test_upload_is_stored_in_chunks(self):
+        # Small uploads arrive in memory as one chunk; files are read CHUNK_SIZE at a time
+        with mock.patch('api.job_files.CHUNK_SIZE', 16):
+            job = enqueue_job('csv_import', self.wallet.user, wallet=self.wallet, input_file=BytesIO(self.csv))
+            self.assertEqual(JobFile.objects.filter(job=job, role=JobFile.INPUT).count(), -(-len(self.csv) // 16))
+            with open_job_file(job, JobFile.INPUT) as stored:
+                self.assertEqual(stored.read(), self.csv)
+
+    def test_csv_import(self):
+        job = self.enqueue_import()
+        self.run_claimed()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'created': 2, 'skipped': 0, 'errors': []})
+        self.assertEqual((job.progress_current, job.progress_total), (2, 2))
+        self.assertFalse(JobFile.objects.filter(job=job).exists())
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('-60.00'))
+
+    def test_claim_order_limit_and_schedule(self):
+        first, second = self.enqueue_import(), self.enqueue_import()
+        later = self.enqueue_import()
+        Job.objects.filter(pk=later.pk).update(run_after=now() + timedelta(hours=1))
+
+        self.assertEqual(claim_jobs(1, 'a'), [first.pk])
+        self.assertEqual(claim_jobs(5, 'b'), [second.pk])
+        self.assertEqual(claim_jobs(5, 'c'), [])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.worker, first.attempts), (Job.RUNNING, 'a', 1))
+
+    def test_failures_are_retried_with_backoff(self):
+        job = self.enqueue_import()
+        failing = {'csv_import': mock.Mock(side_effect=RuntimeError('boom'))}
+        with mock.patch.dict('api.jobs.JOB_HANDLERS', failing), self.assertLogs('api.jobs', 'ERROR'):
+            for attempt in range(1, job.max_attempts + 1):
+                Job.objects.filter(pk=job.pk).update(run_after=now())
+                self.run_claimed()
+                job.refresh_from_db()
+                if attempt < job.max_attempts:
+                    self.assertEqual(job.status, Job.PENDING)
+                    delay = (job.run_after - now()).total_seconds()
+                    self.assertAlmostEqual(delay, 30 * 2 ** (attempt - 1), delta=5)
+                    self.assertTrue(JobFile.objects.filter(job=job, role=JobFile.INPUT).exists())
+        self.assertEqual((job.status, job.error, job.attempts), (Job.FAILED, 'boom', job.max_attempts))
+        # The upload goes once the job has finally failed
+        self.assertFalse(JobFile.objects.filter(job=job).exists())
+
+    def test_malformed_csv_fails_without_retry(self):
+        job = self.enqueue_import(b"date,amount\n01-06-2026,1.00\n")
+        self.run_claimed()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertIn('CSV file must include', job.error)
+
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        retried, exhausted = self.enqueue_import(), self.enqueue_import()
+        claim_jobs(2, 'dead')
+        Job.objects.filter(pk=exhausted.pk).update(attempts=3)
+        Job.objects.update(heartbeat_at=now() - timedelta(minutes=10))
+
+        self.assertEqual(requeue_stale_jobs(60), 1)
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retried.status, retried.worker), (Job.PENDING, ''))
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIsNotNone(exhausted.finished_at)
+        self.assertFalse(JobFile.objects.filter(job=exhausted).exists())
+        self.assertTrue(JobFile.objects.filter(job=retried).exists())
+
+    def test_cancel_pending_job(self):
+        job = self.enqueue_import()
+        response = self.client.post(f'/api/jobs/{job.pk}/cancel/')
+        self.assertEqual(response.json()['status'], Job.CANCELLED)
+        self.assertFalse(JobFile.objects.filter(job=job).exists())
+        self.assertEqual(self.client.post(f'/api/jobs/{job.pk}/cancel/').status_code, 409)
+        # The upload is gone, so an import can't be retried
+        self.assertEqual(self.client.post(f'/api/jobs/{job.pk}/retry/').status_code, 409)
+
+    def test_cancel_running_job(self):
+        job = self.enqueue_import()
+        claim_jobs(1, 'w')
+        self.assertTrue(cancel_job(job))
+        execute_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.CANCELLED)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_pdf_statement_result_download(self):
+        self.seed(40)
+        response = self.client.post('/api/transactions/pdf/jobs/', {'start_date': str(TODAY - timedelta(days=30))}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/result/').status_code, 404)
+
+        self.run_claimed()
+        job = self.client.get(f'/api/jobs/{job_id}/').json()
+        self.assertEqual((job['status'], job['progress_current']), (Job.SUCCEEDED, 40))
+        response = self.client.get(job['result_url'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('transaction_history.pdf', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        # Only the owner can see the job
+        other = make_wallet('mallory')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(other.user, other.pk).access_token}")
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/result/').status_code, 404)
+
+    def test_failed_pdf_statement_can_be_retried(self):
+        self.client.post('/api/transactions/pdf/jobs/', format='json')
+        job = Job.objects.get()
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, attempts=3)
+        response = self.client.post(f'/api/jobs/{job.pk}/retry/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()['status'], response.json()['attempts']), (Job.PENDING, 0))
+
+
+class WalletCacheTests(APITestCase):
+    def balance(self, url='/api/wallet/'):
+        return Decimal(str(self.client.get(url).json()['balance']))
+
+    def test_hits_until_the_next_write(self):
+        reset_cache_stats()
+        add_transaction(self.wallet, '10.00')
+        self.assertEqual(self.balance(), Decimal('10.00'))
+        self.assertEqual(self.balance(), Decimal('10.00'))
+        add_transaction(self.wallet, '5.00', 'credit')
+        self.assertEqual(self.balance(), Decimal('5.00'))
+        self.assertEqual((cache_stats()['hits'], cache_stats()['misses']), (1, 2))
+
+    def test_write_from_another_process_is_not_served_stale(self):
+        # A write whose cache delete only reached another process's cache: the version still moves
+        self.assertEqual(self.balance(), Decimal('0'))
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('42.00'), version=F('version') + 1)
+        self.assertEqual(self.balance(), Decimal('42.00'))
+
+    def test_async_view_checks_the_version(self):
+        self.assertEqual(self.balance('/api/async/wallet/'), Decimal('0'))
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('7.00'), version=F('version') + 1)
+        self.assertEqual(self.balance('/api/async/wallet/'), Decimal('7.00'))
+
+
+class PeriodSummaryTests(APITestCase):
+    url = '/api/analytics/periods/'
+
+    def setUp(self):
+        super().setUp()
+        # 2026-06-15 is a Monday
+        add_transaction(self.wallet, '10.00', 'debit', day=date(2026, 5, 31))
+        add_transaction(self.wallet, '20.00', 'debit', day=date(2026, 6, 1))
+        add_transaction(self.wallet, '5.00', 'credit', day=date(2026, 6, 1))
+        add_transaction(self.wallet, '7.00', 'credit', day=date(2026, 6, 15))
+        add_transaction(make_wallet('bob'), '99.00', 'debit', day=date(2026, 6, 1))
+
+    def periods(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            (row['period'], row['credits'], row['debits'], row['credit_count'], row['debit_count'])
+            for row in response.json()['results']
+        ]
+
+    def test_months(self):
+        self.assertEqual(self.periods(), [
+            ('2026-05-01', '0.00', '10.00', 0, 1),
+            ('2026-06-01', '12.00', '20.00', 2, 1),
+        ])
+
+    def test_weeks_and_days_within_a_range(self):
+        self.assertEqual(self.periods(bucket='week', start_date='2026-06-01'), [
+            ('2026-06-01', '5.00', '20.00', 1, 1),
+            ('2026-06-15', '7.00', '0.00', 1, 0),
+        ])
+        self.assertEqual(self.periods(bucket='day', end_date='2026-06-01'), [
+            ('2026-05-31', '0.00', '10.00', 0, 1),
+            ('2026-06-01', '5.00', '20.00', 1, 1),
+        ])
+
+    def test_deleted_days_drop_out(self):
+        Transaction.objects.filter(wallet=self.wallet, date=date(2026, 5, 31)).get().delete()
+        self.assertEqual(self.periods()[0][0], '2026-06-01')
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'bucket': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start_date': '2026-06-02', 'end_date': '2026-06-01'}).status_code, 400)
+
+
+class BalanceHistoryTests(APITestCase):
+    url = '/api/balance-history/'
+
+    def setUp(self):
+        super().setUp()
+        add_transaction(self.wallet, '100.00', 'debit', day=date(2026, 6, 1))
+        add_transaction(self.wallet, '30.00', 'credit', day=date(2026, 6, 3))
+        add_transaction(self.wallet, '5.00', 'debit', day=date(2026, 6, 10))
+
+    def test_point_query(self):
+        for day, balance in [('2026-05-31', 0), ('2026-06-01', 100), ('2026-06-05', 70), ('2026-07-01', 75)]:
+            with self.subTest(day=day):
+                response = self.client.get(self.url, {'date': day}).json()
+                self.assertEqual(Decimal(str(response['balance'])), Decimal(balance))
+
+    def test_range_query(self):
+        response = self.client.get(self.url, {'start_date': '2026-06-02', 'end_date': '2026-06-30'}).json()
+        self.assertEqual(response['opening_balance'], 100.0)
+        self.assertEqual(response['results'], [
+            {'date': '2026-06-03', 'balance': 70.0},
+            {'date': '2026-06-10', 'balance': 75.0},
+        ])
+
+    def test_backdated_write_moves_later_balances(self):
+        add_transaction(self.wallet, '50.00', 'credit', day=date(2026, 6, 2))
+        response = self.client.get(self.url).json()
+        self.assertEqual([row['balance'] for row in response['results']], [100.0, 50.0, 20.0, 25.0])
+        self.wallet.refresh_from_db()
+        self.assertEqual(Decimal(str(response['results'][-1]['balance'])), self.wallet.balance)
+
+    def test_date_and_range_are_exclusive(self):
+        response = self.client.get(self.url, {'date': '2026-06-01', 'start_date': '2026-06-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+FAST_HASHERS = ['api.hashers.TunablePBKDF2PasswordHasher', 'api.hashers.TunableScryptPasswordHasher']
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PASSWORD_PBKDF2_ITERATIONS=1000)
+class PasswordHasherTests(TestCase):
+    def setUp(self):
+        self.user = make_wallet('alice').user
+        self.client = APIClient()
+
+    def login(self, password='password'):
+        return self.client.post('/api/login/', {'username': 'alice', 'password': password}, format='json')
+
+    def stored_hash(self):
+        self.user.refresh_from_db()
+        return self.user.password
+
+    def test_configured_cost_is_used(self):
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_rehashes_with_a_new_cost(self):
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$2000$'))
+
+    def test_login_rehashes_with_a_new_algorithm(self):
+        with self.settings(PASSWORD_HASHERS=FAST_HASHERS[::-1], PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertTrue(self.stored_hash().startswith('scrypt$'))
+            # The upgraded hash still verifies
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_failed_login_keeps_the_hash(self):
+        stored = self.stored_hash()
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login('wrong').status_code, 400)
+        self.assertEqual(self.stored_hash(), stored)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PASSWORD_PBKDF2_ITERATIONS=1000)
+class TokenClaimTests(TestCase):
+    def setUp(self):
+        self.wallet = make_wallet('alice')
+        self.client = APIClient()
+
+    def assertClaims(self, access):
+        token = AccessToken(access)
+        self.assertEqual(
+            (token['user_id'], token['username'], token['is_staff'], token['wallet_id']),
+            (self.wallet.user_id, 'alice', False, self.wallet.pk),
+        )
+
+    def use(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return self.client.get('/api/transactions/')
+
+    def test_login_and_token_endpoint_issue_the_same_claims(self):
+        for url in ('/api/login/', '/api/token/'):
+            with self.subTest(url=url):
+                response = self.client.post(url, {'username': 'alice', 'password': 'password'}, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertClaims(response.json()['access'])
+
+    def test_claims_survive_refresh(self):
+        tokens = self.client.post('/api/token/', {'username': 'alice', 'password': 'password'}, format='json').json()
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertClaims(response.json()['access'])
+
+    def test_requests_need_no_user_or_wallet_lookup(self):
+        access = self.client.post('/api/login/', {'username': 'alice', 'password': 'password'}, format='json').json()['access']
+        with assert_max_queries(1):
+            self.assertEqual(self.use(access).status_code, 200)
+
+    def test_token_without_wallet_claim_falls_back_to_a_lookup(self):
+        access = AccessToken.for_user(self.wallet.user)
+        add_transaction(self.wallet, '3.00')
+        response = self.use(access)
+        self.assertEqual([row['amount'] for row in response.json()['results']], ['3.00'])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.use('not-a-token').status_code, 401)
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        token = tokens_for_user(self.wallet.user, self.wallet.pk).access_token
+        self.auth = {'Authorization': f"Bearer {token}"}
+        self.async_client = AsyncClient()
+
+    def test_wallet(self):
+        self.seed(3)
+        response = self.client.get('/api/async/wallet/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['balance'], 4.0)
+
+    def test_history_pages_like_the_sync_view(self):
+        self.seed(30)
+        params = {'fields': 'description', 'page_size': 20}
+        page = self.client.get('/api/async/transactions/', params).json()
+        self.assertEqual(page['results'], self.client.get('/api/transactions/', params).json()['results'])
+        self.assertEqual(page['results'][0], {'description': 'Coffee shop 1'})
+        rest = self.client.get(page['next']).json()['results']
+        self.assertEqual(len(page['results']) + len(rest), 30)
+
+    async def test_pdf_is_streamed_in_blocks(self):
+        await sync_to_async(self.seed)(3)
+        # Rendering runs on a pool thread, which cannot see the test transaction, so
+        # render through the sync view; both share the statement cache
+        sync_response = await sync_to_async(self.client.get)('/api/transactions/pdf/')
+        sync_response.close()
+        response = await self.async_client.get('/api/async/transactions/pdf/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertIn('attachment; filename="transaction_history.pdf"', response['Content-Disposition'])
+        body = b''.join([block async for block in response.streaming_content])
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(body))
+
+        response = await self.async_client.get('/api/async/transactions/pdf/', headers={**self.auth, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_rejects_writes_and_anonymous_requests(self):
+        self.assertEqual(self.client.post('/api/async/transactions/').status_code, 405)
+        self.client.credentials()
+        response = self.client.get('/api/async/wallet/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+
+class ExportTests(APITestCase):
+    url = '/api/transactions/export/{}/'
+
+    def setUp(self):
+        super().setUp()
+        token = tokens_for_user(self.wallet.user, self.wallet.pk).access_token
+        self.auth = {'Authorization': f"Bearer {token}"}
+        self.seed(5)
+        add_transaction(make_wallet('bob'), '9.00')
+
+    def body(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def export(self, export_format):
+        return self.body(self.client.get(self.url.format(export_format)))
+
+    def test_csv(self):
+        response = self.client.get(self.url.format('csv'), {'fields': 'description,amount'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="transactions.csv"', response['Content-Disposition'])
+        self.assertEqual(self.body(response).splitlines(), [
+            'description,amount', 'Coffee shop 1,2.00', 'Coffee shop 0,1.00', 'Coffee shop 3,4.00', 'Coffee shop 2,3.00',
+            'Coffee shop 4,5.00',
+        ])
+
+    def test_ndjson_with_filters(self):
+        response = self.client.get(self.url.format('ndjson'), {'transaction_type': 'credit', 'fields': 'date,amount'})
+        self.assertEqual(self.body(response).splitlines(), [
+            '{"date":"2026-06-15","amount":"1.00"}', '{"date":"2026-06-14","amount":"4.00"}',
+        ])
+
+    def test_rows_are_sent_in_batches(self):
+        with mock.patch('api.exports.BATCH_SIZE', 2):
+            response = self.client.get(self.url.format('ndjson'))
+            chunks = list(response.streaming_content)
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 2, 1])
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(self.url.format('xlsx')).status_code, 404)
+
+    def test_parquet_without_pyarrow(self):
+        with mock.patch.dict(sys.modules, {'pyarrow': None}):
+            response = self.client.get(self.url.format('parquet'))
+        self.assertEqual(response.status_code, 501)
+        self.assertIn('pyarrow', response.json()['error'])
+
+    async def test_async_export_matches_the_sync_one(self):
+        for export_format in ('csv', 'ndjson'):
+            expected = await sync_to_async(self.export)(export_format)
+            response = await self.async_client_get(f'/api/async/transactions/export/{export_format}/')
+            self.assertTrue(response.is_async)
+            self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]).decode(), expected)
+
+    async def test_async_parquet_without_pyarrow(self):
+        with mock.patch.dict(sys.modules, {'pyarrow': None}):
+            response = await self.async_client_get('/api/async/transactions/export/parquet/')
+        self.assertEqual(response.status_code, 501)
+
+    async def async_client_get(self, url):
+        return await AsyncClient().get(url, headers=self.auth)
+
+
+class InsightsTests(APITestCase):
+    url = '/api/analytics/insights/'
+
+    def setUp(self):
+        super().setUp()
+        for days_ago in (60, 30, 0):
+            add_transaction(self.wallet, '1000.00', 'debit', day=TODAY - timedelta(days=days_ago), description='Rent')
+        for days_ago in (45, 15):
+            add_transaction(self.wallet, '2000.00', 'credit', day=TODAY - timedelta(days=days_ago), description='Salary')
+        add_transaction(self.wallet, '50.00', day=TODAY - timedelta(days=1))
+        add_transaction(self.wallet, '30.00', day=TODAY - timedelta(days=2))
+
+    def insights(self, **params):
+        response = self.client.get(self.url, {'end_date': str(TODAY), **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_summary_descriptions_and_largest(self):
+        insights = self.insights(top=3)
+        self.assertEqual(insights['summary'], {
+            'transactions': 7, 'debits': 3080.0, 'credits': 4000.0, 'net': -920.0,
+            'first_date': str(TODAY - timedelta(days=60)), 'last_date': str(TODAY),
+        })
+        self.assertEqual(
+            [(row['description'], row['count'], row['debits'], row['credits']) for row in insights['descriptions']],
+            [('Rent', 3, 3000.0, 0.0), ('Groceries', 2, 80.0, 0.0), ('Salary', 2, 0.0, 4000.0)],
+        )
+        self.assertEqual([row['amount'] for row in insights['largest']], [2000.0, 2000.0, 1000.0])
+        self.assertEqual(insights['rolling'][-1]['date'], str(TODAY))
+        self.assertEqual(insights['rolling'][-1]['net'], 1000.0)
+
+    def test_recurring(self):
+        recurring = self.insights()['recurring']
+        self.assertEqual(len(recurring), 1)
+        self.assertEqual(
+            {key: recurring[0][key] for key in ('description', 'cadence', 'amount', 'occurrences', 'next_date')},
+            {'description': 'Rent', 'cadence': 'monthly', 'amount': 1000.0, 'occurrences': 3,
+             'next_date': str(TODAY + timedelta(days=30))},
+        )
+
+    def test_past_period_forecast_starts_from_its_closing_balance(self):
+        forecast = self.insights(end_date=str(TODAY - timedelta(days=20)), horizon=5)['forecast']
+        # Two rents less one salary by then, not today's balance of -920
+        self.assertEqual(forecast['starting_balance'], 0.0)
+        self.assertEqual(
+            [point['date'] for point in forecast['points']],
+            [str(TODAY - timedelta(days=days_ago)) for days_ago in range(19, 14, -1)],
+        )
+
+    def test_cached_until_the_wallet_changes(self):
+        first = self.insights()
+        with assert_max_queries(1):
+            self.assertEqual(self.insights(), first)
+        add_transaction(self.wallet, '5.00')
+        self.assertEqual(self.insights()['summary']['transactions'], 8)
+
+    def test_empty_wallet(self):
+        Transaction.objects.filter(wallet=self.wallet).delete()
+        insights = self.insights(horizon=3)
+        self.assertEqual(insights['summary']['transactions'], 0)
+        self.assertEqual(insights['recurring'], [])
+        self.assertEqual(len(insights['forecast']['points']), 3)
+
+
+class SearchTests(APITestCase):
+    url = '/api/transactions/search/'
+
+    def setUp(self):
+        super().setUp()
+        add_transaction(self.wallet, '4.00', day=TODAY - timedelta(days=2), description='Coffee')
+        add_transaction(self.wallet, '9.00', day=TODAY - timedelta(days=1), description='Coffee beans and a new coffee grinder from the market')
+        add_transaction(self.wallet, '3.00', description='Green tea')
+        add_transaction(make_wallet('bob'), '5.00', description='Coffee')
+
+    def search(self, q):
+        response = self.client.get(self.url, {'q': q, 'fields': 'description'})
+        self.assertEqual(response.status_code, 200)
+        return [(row['description'], row['rank']) for row in response.json()['results']]
+
+    def test_matches_are_ranked_by_relevance(self):
+        results = self.search('COFFEE')
+        self.assertEqual([description for description, rank in results], [
+            'Coffee', 'Coffee beans and a new coffee grinder from the market',
+        ])
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_substring_and_query_syntax_are_matched_literally(self):
+        self.assertEqual([description for description, rank in self.search('ee gri')], [
+            'Coffee beans and a new coffee grinder from the market',
+        ])
+        self.assertEqual(self.search('"coffee" OR tea'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        tea = Transaction.objects.get(description='Green tea')
+        tea.description = 'Oolong'
+        tea.save()
+        self.assertEqual(self.search('tea'), [])
+        self.assertEqual(len(self.search('oolong')), 1)
+        tea.delete()
+        self.assertEqual(self.search('oolong'), [])
+
+    def test_short_terms_and_missing_index_fall_back_to_a_scan(self):
+        # Newest first, all with the same rank
+        expected = [('Coffee beans and a new coffee grinder from the market', 1.0), ('Coffee', 1.0)]
+        self.assertEqual(self.search('co'), expected)
+        with mock.patch('api.search._has_fts_table', return_value=False):
+            self.assertEqual(self.search('coffee'), expected)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def request(self, method='GET', view_name='transaction_history', user_id=None):
+        request = RequestFactory().generic(method, '/')
+        request.resolver_match = mock.Mock(view_name=view_name)
+        request.user = mock.Mock(is_authenticated=user_id is not None, pk=user_id)
+        return request
+
+    def route(self, request, model=Transaction):
+        token = current_routing.set(RequestRouting(request))
+        try:
+            ReadReplicaMiddleware(lambda request: None).process_view(request, None, (), {})
+            return ReplicaRouter().db_for_read(model)
+        finally:
+            current_routing.reset(token)
+
+    def test_reads_from_listed_views_go_to_a_replica(self):
+        self.assertEqual(self.route(self.request(user_id=1)), 'replica_1')
+        self.assertIsNone(self.route(self.request(view_name='job-detail', user_id=1)))
+        self.assertIsNone(self.route(self.request('POST', user_id=1)))
+
+    def test_auth_tables_and_transactions_stay_on_the_primary(self):
+        self.assertEqual(self.route(self.request(user_id=1), model=User), 'default')
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.route(self.request(user_id=1)), 'default')
+
+    def test_writers_are_pinned_to_the_primary(self):
+        middleware = ReadReplicaMiddleware(lambda request: HttpResponse(status=201))
+        middleware(self.request('POST', user_id=1))
+        self.assertTrue(is_pinned(1))
+        self.assertEqual(self.route(self.request(user_id=1)), 'default')
+        self.assertEqual(self.route(self.request(user_id=2)), 'replica_1')
+
+    def test_failed_writes_and_no_replicas_do_not_pin(self):
+        ReadReplicaMiddleware(lambda request: HttpResponse(status=400))(self.request('POST', user_id=1))
+        self.assertFalse(is_pinned(1))
+        with self.settings(DATABASE_REPLICAS=[]):
+            pin_to_primary(1)
+            self.assertIsNone(self.route(self.request(user_id=1)))
+        self.assertFalse(is_pinned(1))
+
+    def test_pin_cache_check(self):
+        self.assertEqual([error.id for error in check_replica_pin_cache(None)], ['api.E001'])
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}}
+        with self.settings(CACHES=file_cache):
+            self.assertEqual([error.id for error in check_replica_pin_cache(None)], ['api.W001'])
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_replica_pin_cache(None), [])
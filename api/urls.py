@@ -1,10 +1,34 @@
 from django.urls import path 
-from .views import get_wallet, register_user, login_user, TransactionHistoryView, TransactionHistoryPDFView
+from .views import (
+    get_wallet, wallet_cache_stats, register_user, login_user, metrics,
+    TransactionHistoryView, TransactionSearchView, BulkTransactionIngestView, TransactionExportView, TransactionHistoryPDFView, TransactionHistoryPDFJobView,
+    PeriodSummaryView, InsightsView, BalanceHistoryView,
+    JobDetailView, JobResultView, cancel_job_view, retry_job_view,
+)
+from . import async_views
 
 urlpatterns = [
     path('register/', register_user, name='register_user'), 
     path('login/', login_user, name='login_user'), 
     path('wallet/', get_wallet, name='get_wallet'),
+    path('wallet/cache-stats/', wallet_cache_stats, name='wallet_cache_stats'),
+    path('metrics/', metrics, name='metrics'),
     path('transactions/', TransactionHistoryView.as_view(), name='transaction_history'),
+    path('transactions/search/', TransactionSearchView.as_view(), name='transaction-search'),
+    path('transactions/bulk/', BulkTransactionIngestView.as_view(), name='transaction-bulk-ingest'),
+    path('transactions/export/<str:export_format>/', TransactionExportView.as_view(), name='transaction-export'),
     path('transactions/pdf/', TransactionHistoryPDFView.as_view(), name='transaction-history-pdf'),
+    path('transactions/pdf/jobs/', TransactionHistoryPDFJobView.as_view(), name='transaction-history-pdf-job'),
+    path('analytics/periods/', PeriodSummaryView.as_view(), name='period-summary'),
+    path('analytics/insights/', InsightsView.as_view(), name='insights'),
+    path('balance-history/', BalanceHistoryView.as_view(), name='balance-history'),
+    path('jobs/<int:pk>/', JobDetailView.as_view(), name='job-detail'),
+    path('jobs/<int:pk>/result/', JobResultView.as_view(), name='job-result'),
+    path('jobs/<int:pk>/cancel/', cancel_job_view, name='job-cancel'),
+    path('jobs/<int:pk>/retry/', retry_job_view, name='job-retry'),
+    # Async variants of the read paths, for the ASGI deployment
+    path('async/wallet/', async_views.get_wallet, name='async-get-wallet'),
+    path('async/transactions/', async_views.transaction_history, name='async-transaction-history'),
+    path('async/transactions/pdf/', async_views.transaction_history_pdf, name='async-transaction-history-pdf'),
+    path('async/transactions/export/<str:export_format>/', async_views.transaction_export, name='async-transaction-export'),
 ]
\ No newline at end of file
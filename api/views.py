@@ -1,41 +1,78 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.contrib.auth.models import User
+from django.db import IntegrityError, router, transaction as db_transaction
 from django.shortcuts import render
 from rest_framework.response import Response
-from .models import Wallet, Transaction
-from .serializers import WalletSerializer, TransactionSerializer
+from .models import Wallet, Transaction, Job, JobFile, DailySummary, BalanceSnapshot
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from .serializers import (
+    WalletSerializer, TransactionSerializer, TransactionFilterSerializer, TransactionSearchQuerySerializer,
+    TransactionSearchResultSerializer, DateRangeSerializer, JobSerializer,
+    PeriodSummaryQuerySerializer, PeriodSummarySerializer, InsightsQuerySerializer, BalanceHistoryQuerySerializer, BalanceSnapshotSerializer,
+)
+from .jobs import INPUT_KINDS, enqueue_job, cancel_job, retry_job
+from .job_files import has_job_file, open_job_file
+from .wallet_cache import get_wallet_summary, cache_stats
+from .ingest import ingest_transactions, IngestConflict, IngestTooLarge
+from .exports import CONTENT_TYPES, ExportUnavailable, export_columns, export_rows, stream_csv, stream_ndjson, write_parquet
+from .parsers import NDJSONParser
+from rest_framework.parsers import JSONParser
+from django.conf import settings
+from .pagination import TransactionCursorPagination, SearchPagination
+from .search import search_transactions
+from .authentication import tokens_for_user
+from .db_routers import pin_to_primary
 from rest_framework.views import APIView
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from .metrics import registry
+from django.shortcuts import get_object_or_404
 from django.template.loader import get_template
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from io import BytesIO
-from django.db import models
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from .statement_cache import open_cached_statement, statement_digest
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 
+def _wallet_id(request):
+    # Access tokens issued at login carry the wallet id; older tokens fall back to a lookup
+    wallet_id = getattr(request.user, 'wallet_id', None)
+    if wallet_id is None:
+        wallet_id = Wallet.objects.get_or_create(user_id=request.user.pk)[0].pk
+    return wallet_id
+
+
+def _wallet(request, queryset=None):
+    if queryset is None:
+        queryset = Wallet.objects.all()
+    return get_object_or_404(queryset, pk=_wallet_id(request))
+
 
 @api_view (['GET'])
 @permission_classes([IsAuthenticated])
 def get_wallet(request):
-    wallet, _ = Wallet.objects.get_or_create(user=request.user)
-    serializer = WalletSerializer(wallet)
-
-    total_credits = Transaction.objects.filter(wallet=wallet, transaction_type='credit').aggregate(total=models.Sum('amount'))['total'] or 0
-    total_debits = Transaction.objects.filter(wallet=wallet, transaction_type='debit').aggregate(total=models.Sum('amount'))['total'] or 0
-    
-    balance = total_debits - total_credits
+    # The balance is maintained on the wallet row, and the payload is cached per wallet version
+    def build():
+        return dict(WalletSerializer(_wallet(request)).data)
 
+    return Response(get_wallet_summary(request.user.pk, build))
 
-    wallet_data = serializer.data
-    wallet_data['balance'] = balance
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def wallet_cache_stats(request):
+    return Response(cache_stats())
 
-    return Response(wallet_data)
+def metrics(request):
+    # Prometheus scrape endpoint, outside DRF so scrapers only need the static METRICS_TOKEN
+    if not settings.METRICS_TOKEN:
+        raise Http404()
+    if not constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {settings.METRICS_TOKEN}"):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -45,13 +82,16 @@ def register_user(request):
 
     if not username or not password:
         return Response({"error": "Username and password are required"}, status=400)
-    
-    if User.objects.filter(username=username).exists():
-        return Response({"error": "Username already taken"}, status=400)
-    
 
-    user = User.objects.create_user(username=username, password=password)
-    Wallet.objects.create(user=user)
+    # Let the unique index on username reject duplicates instead of checking first
+    try:
+        with db_transaction.atomic():
+            user = User.objects.create_user(username=username, password=password)
+            Wallet.objects.create(user=user)
+    except IntegrityError:
+        return Response({"error": "Username already taken"}, status=400)
+    # The request is anonymous, so pin the new user here until replicas have their wallet
+    pin_to_primary(user.pk)
     return Response({"message": "User registered successfully"}, status=201)
 
 
@@ -61,9 +101,12 @@ def login_user(request):
     username = request.data.get('username')
     password = request.data.get('password')
 
-    user = User.objects.filter(username=username).first()
+    # check_password() rehashes with the configured PASSWORD_HASHER/cost when the stored hash is outdated
+    user = User.objects.select_related('wallet').filter(username=username).first()
     if user and user.check_password(password):
-        refresh = RefreshToken.for_user(user)
+        # Put the wallet id in the token so authenticated requests need no user or wallet lookup
+        wallet = getattr(user, 'wallet', None) or Wallet.objects.get_or_create(user=user)[0]
+        refresh = tokens_for_user(user, wallet.pk)
         return Response({
             "refresh": str(refresh),
             "access": str(refresh.access_token)
@@ -75,79 +118,265 @@ def login_user(request):
 class TransactionHistoryView(APIView):
     permission_classes = [IsAuthenticated]
 
+    pagination_class = TransactionCursorPagination
+
     def get(self, request):
-        user = request.user
-        transactions = Transaction.objects.filter(wallet__user=user)
-        serializer = TransactionSerializer(transactions, many=True)
-        return Response(serializer.data)
+        params = TransactionFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        fields = filters.pop('fields', None) or TransactionSerializer.Meta.fields
+
+        transactions = Transaction.objects.filter(wallet_id=_wallet_id(request)).filtered(**filters)
+
+        # Only fetch the projected columns plus the (date, id) keyset the cursor needs
+        columns = dict.fromkeys(['id', 'date', *fields])
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(transactions.values(*columns), request, view=self)
+        serializer = TransactionSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
     
 
+class TransactionSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def get(self, request):
+        params = TransactionSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        term = filters.pop('q')
+        fields = filters.pop('fields', None) or TransactionSerializer.Meta.fields
+
+        # Matched through the description search index and ranked by relevance, then recency
+        transactions = Transaction.objects.filter(wallet_id=_wallet_id(request)).filtered(**filters)
+        results = search_transactions(transactions, term).values('rank', *fields)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(results, request, view=self)
+        serializer = TransactionSearchResultSerializer(page, many=True, fields=[*fields, 'rank'])
+        return paginator.get_paginated_response(serializer.data)
+
+
+class PeriodSummaryView(APIView):
+    permission_classes = [IsAuthenticated]
+    truncations = {'day': F('date'), 'week': TruncWeek('date'), 'month': TruncMonth('date')}
+
+    def get(self, request):
+        params = PeriodSummaryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        bucket = filters.pop('bucket')
+
+        # Grouped in SQL over the per-day rollups rather than the raw transactions
+        summaries = DailySummary.objects.filter(wallet_id=_wallet_id(request))
+        if filters.get('start_date'):
+            summaries = summaries.filter(date__gte=filters['start_date'])
+        if filters.get('end_date'):
+            summaries = summaries.filter(date__lte=filters['end_date'])
+        periods = (
+            summaries.annotate(period=self.truncations[bucket])
+            .values('period')
+            .annotate(
+                credits=Sum('credits'),
+                debits=Sum('debits'),
+                credit_count=Sum('credit_count'),
+                debit_count=Sum('debit_count'),
+            )
+            .order_by('period')
+        )
+        return Response({
+            'bucket': bucket,
+            'results': PeriodSummarySerializer(periods, many=True).data,
+        })
+
+
+class InsightsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .analytics import wallet_insights  # numpy/pandas, loaded on first use
+
+        params = InsightsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        # Cached per wallet version, so repeated dashboard loads cost one wallet lookup
+        return Response(wallet_insights(_wallet(request), **params.validated_data))
+
+
+class BalanceHistoryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = BalanceHistoryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        wallet_id = _wallet_id(request)
+
+        # Point query: closing balance of the given day
+        if query.get('date'):
+            balance = BalanceSnapshot.objects.balance_on(wallet_id, query['date'])
+            return Response({'date': query['date'], 'balance': balance})
+
+        # Range query: balance going into the range, then each day's closing balance
+        snapshots = BalanceSnapshot.objects.filter(wallet_id=wallet_id).order_by('date')
+        opening_balance = Decimal('0')
+        if query.get('start_date'):
+            snapshots = snapshots.filter(date__gte=query['start_date'])
+            opening_balance = BalanceSnapshot.objects.balance_on(wallet_id, query['start_date'] - timedelta(days=1))
+        if query.get('end_date'):
+            snapshots = snapshots.filter(date__lte=query['end_date'])
+        return Response({
+            'opening_balance': opening_balance,
+            'results': BalanceSnapshotSerializer(snapshots, many=True).data,
+        })
+
+
+class BulkTransactionIngestView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('transactions')
+        if items is None or isinstance(items, (str, dict)):
+            return Response({"error": "Send a JSON array of transactions or an NDJSON stream"}, status=400)
+
+        idempotency_prefix = request.headers.get('Idempotency-Key')
+        if idempotency_prefix and len(idempotency_prefix) > 80:
+            return Response({"error": "Idempotency-Key must be at most 80 characters"}, status=400)
+
+        wallet = _wallet(request)
+        try:
+            result = ingest_transactions(
+                wallet, items, idempotency_prefix=idempotency_prefix, max_items=settings.BULK_INGEST_MAX_ITEMS,
+            )
+        except IngestTooLarge as e:
+            return Response({"error": str(e)}, status=413)
+        except IngestConflict as e:
+            return Response({"error": str(e)}, status=409)
+        return Response({"created": result.created, "duplicates": result.duplicates}, status=201)
+
+
 class TransactionHistoryPDFView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        transactions = Transaction.objects.filter(wallet__user=user)
-
-        # Get the user's wallet balance
-        wallet, _ = Wallet.objects.get_or_create(user=user)
-        total_credits = Transaction.objects.filter(wallet=wallet, transaction_type='credit').aggregate(total=models.Sum('amount'))['total'] or 0
-        total_debits = Transaction.objects.filter(wallet=wallet, transaction_type='debit').aggregate(total=models.Sum('amount'))['total'] or 0
-        balance = total_debits - total_credits  # Calculate balance
-
-        # Create a buffer to hold the PDF data
-        buffer = BytesIO()
-
-        # Create the PDF document
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-
-        # Get default styles
-        styles = getSampleStyleSheet()
-
-        # Add title and balance display
-        title = Paragraph(f"<b>Transaction History for {user.username}</b>", styles["Title"])
-        balance_text = Paragraph(f"<b>Current Balance: £{balance:.2f}</b>", styles["Normal"])
-
-        # Define the table headers
-        data = [["Date", "Description", "Amount (£)", "Type"]]
-
-        # Add transaction data
-        for transaction in transactions:
-            data.append([str(transaction.date), transaction.description, f"£{transaction.amount:.2f}", transaction.transaction_type])
-
-        # Create a table with proper column widths
-        table = Table(data, colWidths=[100, 200, 100, 100])
-
-        # Apply table styling
-        style = TableStyle([
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),  # Header color
-            ('BACKGROUND', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ])
-        table.setStyle(style)
-
-        # Build the PDF with title, balance, and table
-        elements = [
-            title,
-            Spacer(1, 12),  # Space after title
-            balance_text,
-            Spacer(1, 20),  # Space before table
-            table
-        ]
-
-        doc.build(elements)
-
-        # Prepare the HttpResponse
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="transaction_history.pdf"'
-
-        # Move to the start of the buffer and write the PDF content to the response
-        buffer.seek(0)
-        response.write(buffer.getvalue())
-
-        return response
\ No newline at end of file
+        period = DateRangeSerializer(data=request.query_params)
+        period.is_valid(raise_exception=True)
+        wallet = _wallet(request, Wallet.objects.select_related('user'))
+
+        # The statement only changes when the wallet's version does, so clients can revalidate cheaply
+        etag = quote_etag(statement_digest(wallet, 'pdf', period.validated_data))
+        last_modified = int(wallet.updated_at.timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        from .statements import write_transaction_pdf  # reportlab, loaded on first use
+
+        # Rendered page by page into a cache file and streamed out, never held in memory. That
+        # holds under WSGI; ASGI reads sync bodies whole, so it serves async/transactions/pdf/
+        output = open_cached_statement(
+            wallet, 'pdf', period.validated_data,
+            lambda file: write_transaction_pdf(wallet, file, **period.validated_data),
+        )
+        response = FileResponse(output, as_attachment=True, filename='transaction_history.pdf', content_type='application/pdf')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class TransactionExportView(APIView):
+    permission_classes = [IsAuthenticated]
+    streams = {'csv': stream_csv, 'ndjson': stream_ndjson}
+
+    def get(self, request, export_format):
+        if export_format not in CONTENT_TYPES:
+            return Response({"error": f"Unsupported export format, use one of: {', '.join(CONTENT_TYPES)}"}, status=404)
+        params = TransactionFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        columns = export_columns(filters.pop('fields', None))
+        filename = f"transactions.{export_format}"
+
+        if export_format in self.streams:
+            # The body streams after the request's database routing has ended, so pick the database now.
+            # Like the PDF above, only under WSGI; the ASGI deployment serves async/transactions/export/
+            rows = export_rows(_wallet_id(request), columns, using=router.db_for_read(Transaction), **filters)
+            response = StreamingHttpResponse(self.streams[export_format](rows, columns), content_type=CONTENT_TYPES[export_format])
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        # Parquet needs a seekable file, so it is built into the statement cache and served from there
+        wallet = _wallet(request)
+        try:
+            output = open_cached_statement(
+                wallet, export_format, {**filters, 'fields': ','.join(columns)},
+                lambda file: write_parquet(export_rows(wallet.pk, columns, **filters), columns, file),
+            )
+        except ExportUnavailable as e:
+            return Response({"error": str(e)}, status=501)
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=CONTENT_TYPES[export_format])
+
+
+class TransactionHistoryPDFJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Queue the statement instead of rendering it inside the request
+        period = DateRangeSerializer(data=request.data or request.query_params)
+        period.is_valid(raise_exception=True)
+        params = {name: value.isoformat() for name, value in period.validated_data.items()}
+
+        wallet = _wallet(request)
+        job = enqueue_job('pdf_statement', request.user, wallet=wallet, params=params)
+        return Response(JobSerializer(job, context={'request': request}).data, status=202)
+
+
+def _user_jobs(request):
+    return Job.objects.filter(user_id=request.user.pk)
+
+
+class JobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(_user_jobs(request), pk=pk)
+        return Response(JobSerializer(job, context={'request': request}).data)
+
+
+class JobResultView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(Job.objects.filter(user_id=request.user.pk, status=Job.SUCCEEDED), pk=pk)
+        if not has_job_file(job, JobFile.RESULT):
+            return Response({"error": "This job has no downloadable result"}, status=404)
+
+        # Streamed from the stored chunks, one query per chunk
+        return FileResponse(
+            open_job_file(job, JobFile.RESULT), as_attachment=True,
+            filename=job.result_filename, content_type=job.result_content_type,
+        )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cancel_job_view(request, pk):
+    job = get_object_or_404(_user_jobs(request), pk=pk)
+    if not cancel_job(job):
+        return Response({"error": f"Cannot cancel a {job.status} job"}, status=409)
+    job.refresh_from_db()
+    return Response(JobSerializer(job, context={'request': request}).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def retry_job_view(request, pk):
+    job = get_object_or_404(_user_jobs(request), pk=pk)
+    if job.kind in INPUT_KINDS:
+        return Response({"error": "The upload of a finished import is deleted; upload the file again"}, status=409)
+    if not retry_job(job):
+        return Response({"error": f"Only failed or cancelled jobs can be retried, this one is {job.status}"}, status=409)
+    job.refresh_from_db()
+    return Response(JobSerializer(job, context={'request': request}).data, status=202)
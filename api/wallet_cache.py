@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import caches
+from .models import Wallet
+
+# Cache for the wallet summary payload served by get_wallet. Entries are keyed by
+# user and hold the Wallet.version they were built from; an entry is only served
+# while the wallet still has that version. The version read is one lookup on the
+# unique user index, and it catches writes made by any process (other web
+# workers, the `run_jobs` worker), whose deletes in api.signals only reach their
+# own process's cache with the default per-process LocMemCache.
+
+HITS_KEY = 'wallet-summary:hits'
+MISSES_KEY = 'wallet-summary:misses'
+
+
+def _cache():
+    return caches[settings.WALLET_CACHE_ALIAS]
+
+
+def wallet_summary_key(user_id):
+    return f"wallet-summary:user:{user_id}"
+
+
+def _versions(user_id):
+    return Wallet.objects.filter(user_id=user_id).values_list('version', flat=True)
+
+
+def get_wallet_summary(user_id, build):
+    cache = _cache()
+    key = wallet_summary_key(user_id)
+    # Read before building, so an entry can only be older than the payload it holds
+    version = _versions(user_id).first()
+    entry = cache.get(key)
+    if entry is not None and version is not None and entry[0] == version:
+        _incr(cache, HITS_KEY)
+        return entry[1]
+
+    _incr(cache, MISSES_KEY)
+    payload = build()
+    cache.set(key, (version, payload), settings.WALLET_CACHE_TIMEOUT)
+    return payload
+
+
+async def aget_wallet_summary(user_id, build):
+    # Variant of get_wallet_summary for the async views; `build` is a coroutine function
+    cache = _cache()
+    key = wallet_summary_key(user_id)
+    version = await _versions(user_id).afirst()
+    entry = await cache.aget(key)
+    if entry is not None and version is not None and entry[0] == version:
+        await _aincr(cache, HITS_KEY)
+        return entry[1]
+
+    await _aincr(cache, MISSES_KEY)
+    payload = await build()
+    await cache.aset(key, (version, payload), settings.WALLET_CACHE_TIMEOUT)
+    return payload
+
+
+def invalidate_wallet_summary(user_id):
+    _cache().delete(wallet_summary_key(user_id))
+
+
+def cache_stats():
+    # Counters live in the cache itself, so they are shared by every process using a shared backend
+    counters = _cache().get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    return {
+        'backend': settings.CACHES[settings.WALLET_CACHE_ALIAS]['BACKEND'],
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else None,
+    }
+
+
+def reset_cache_stats():
+    _cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def _incr(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First hit/miss: create the counter; if another process won the race, increment theirs
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _aincr(cache, key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
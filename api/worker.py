@@ -0,0 +1,12 @@
+# Entry points for `run_jobs` pool processes. Children are spawned from a clean
+# interpreter, so this module must not import models before django.setup() runs.
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def run_job(job_id):
+    from .jobs import execute_job
+    execute_job(job_id)
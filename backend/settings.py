@@ -10,8 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 from datetime import timedelta
 import dj_database_url
 
@@ -48,11 +49,14 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Builds request.user from the token claims instead of loading the User row
+        'api.authentication.WalletJWTAuthentication',
     ),
 }
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.ReadReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -94,6 +98,16 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections are kept open between requests (CONN_MAX_AGE) and pinged before reuse
+# (CONN_HEALTH_CHECKS), so requests do not pay for a new TLS handshake. With DB_POOL
+# enabled each process instead keeps a psycopg 3 pool of at most
+# DB_CONNECTION_BUDGET / WEB_CONCURRENCY connections. Check the effective settings
+# with `manage.py database_info`. Under ASGI (backend/asgi.py) persistent connections
+# are not safe, so each request opens its own unless DB_POOL is enabled.
+
+SERVING_ASGI = config('DJANGO_SERVER_INTERFACE', default='wsgi') == 'asgi'
+DB_CONN_MAX_AGE = 0 if SERVING_ASGI else config('DB_CONN_MAX_AGE', default=600, cast=int)
+
 DATABASES={}
 
 if DEBUG:
@@ -103,9 +117,140 @@ if DEBUG:
 
     }
 else:
-    DATABASES['default'] = dj_database_url.config(conn_max_age=600, ssl_require=True)
-    DATABASES['default'] = dj_database_url.config(default=config('DATABASE_URL'))
+    DATABASES['default'] = dj_database_url.config(
+        default=config('DATABASE_URL'),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        ssl_require=config('DB_SSL_REQUIRE', default=True, cast=bool),
+    )
+
+# Read replicas: DATABASE_REPLICA_URLS is a comma-separated list of database URLs,
+# added as replica_1, replica_2, ... The views in REPLICA_READ_VIEWS read from a
+# random replica, except for users who made a write in the last
+# REPLICA_STICKY_SECONDS (see api/db_routers.py). That pin is kept in the default
+# cache, so replicas need a cache shared by all web processes (system check api.E001).
+# To try it locally, copy db.sqlite3 to db-replica.sqlite3 and set
+# DATABASE_REPLICA_URLS=sqlite:///db-replica.sqlite3 and CACHE_BACKEND=file;
+# writes then only show up on the replica after copying the file again, like replication lag.
+
+DATABASE_REPLICAS = []
+for number, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica_{number}'] = dj_database_url.parse(
+        url,
+        conn_max_age=0 if DEBUG else DB_CONN_MAX_AGE,
+        conn_health_checks=not DEBUG,
+        ssl_require=not DEBUG and config('DB_SSL_REQUIRE', default=True, cast=bool),
+        # Tests run against the primary only
+        test_options={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+REPLICA_READ_VIEWS = [
+    'get_wallet', 'transaction_history', 'transaction-search', 'transaction-export', 'transaction-history-pdf',
+    'period-summary', 'insights', 'balance-history',
+    'async-get-wallet', 'async-transaction-history', 'async-transaction-history-pdf', 'async-transaction-export',
+]
+
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=2, cast=int)
+DB_CONNECTION_BUDGET = config('DB_CONNECTION_BUDGET', default=20, cast=int)
+
+if not DEBUG and config('DB_POOL', default=False, cast=bool):
+    # psycopg 3 with psycopg-pool (requirements.txt); pooled connections replace persistent ones
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=max(DB_CONNECTION_BUDGET // max(WEB_CONCURRENCY, 1), 1), cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+
+
+
+# Caching
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process memory by default; CACHE_BACKEND=file shares entries between the workers of one host.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'finance-backend',
+    },
+}
+
+if config('CACHE_BACKEND', default='locmem') == 'file':
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'finance-cache')),
+    }
+
+# Wallet summaries are checked against Wallet.version before they are served, so a per-process
+# cache never serves a balance another process has changed
+WALLET_CACHE_ALIAS = 'default'
+WALLET_CACHE_TIMEOUT = config('WALLET_CACHE_TIMEOUT', default=300, cast=int)
+# Spending insights are keyed by wallet version, so this only bounds how long stale versions linger
+ANALYTICS_CACHE_TIMEOUT = config('ANALYTICS_CACHE_TIMEOUT', default=3600, cast=int)
+
+
+# Rendered PDF statements/exports, keyed by wallet version (see api/statement_cache.py)
+STATEMENT_CACHE_DIR = config('STATEMENT_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'finance-statements'))
+
+
+# Largest batch accepted by the transactions/bulk/ ingest endpoint
+BULK_INGEST_MAX_ITEMS = config('BULK_INGEST_MAX_ITEMS', default=10000, cast=int)
+
+
+# Background jobs (see api/jobs.py and `manage.py run_jobs`)
+JOBS_RUN_INLINE = config('JOBS_RUN_INLINE', default=False, cast=bool)
+JOBS_WORKER_PROCESSES = config('JOBS_WORKER_PROCESSES', default=2, cast=int)
+
+
+# Transaction storage: monthly partitions on PostgreSQL (`manage.py partition_transactions`)
+# and archival of old history into compressed per-month archives (`manage.py archive_transactions`).
+# Partitioning is off until TRANSACTION_PARTITIONING is set; once the table is converted, migrations
+# that change the Transaction model have to be written by hand (see api/partitioning.py)
+TRANSACTION_PARTITIONING = config('TRANSACTION_PARTITIONING', default=False, cast=bool)
+TRANSACTION_PARTITION_MONTHS_AHEAD = config('TRANSACTION_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+TRANSACTION_ARCHIVE_AFTER_DAYS = config('TRANSACTION_ARCHIVE_AFTER_DAYS', default=730, cast=int)
+
+
+# Per-view request metrics (see api/middleware.py); scraped from /api/metrics/ with
+# "Authorization: Bearer <METRICS_TOKEN>". The endpoint is disabled without a token.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_EXCLUDED_VIEWS = ['metrics']
+SLOW_REQUEST_SECONDS = config('SLOW_REQUEST_SECONDS', default=1.0, cast=float)
+SLOW_REQUEST_LOGGED_QUERIES = 10
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+# PASSWORD_HASHER picks the algorithm new hashes use; the others stay listed so
+# existing hashes verify and are upgraded on the user's next login.
+
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2_sha256')
+_TUNABLE_HASHERS = {
+    'pbkdf2_sha256': 'api.hashers.TunablePBKDF2PasswordHasher',
+    'scrypt': 'api.hashers.TunableScryptPasswordHasher',
+    'argon2': 'api.hashers.TunableArgon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_TUNABLE_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _TUNABLE_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Cost parameters; unset means Django's default for that algorithm
+def _optional_int(value):
+    return int(value) if value not in (None, '') else None
 
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=None, cast=_optional_int)
+PASSWORD_SCRYPT_WORK_FACTOR = config('PASSWORD_SCRYPT_WORK_FACTOR', default=None, cast=_optional_int)
+PASSWORD_SCRYPT_PARALLELISM = config('PASSWORD_SCRYPT_PARALLELISM', default=None, cast=_optional_int)
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=None, cast=_optional_int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=None, cast=_optional_int)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=None, cast=_optional_int)
 
 
 # Password validation